@@ -2,112 +2,78 @@
 CI helper: generate a markdown changelog from git diff.
 
 Usage:
-  python .github/scripts/ci_changelog.py <base_sha>
+  python .github/scripts/ci_changelog.py <base_sha> [--summary-only] [--cache-dir DIR]
+
+The diff itself comes from ci_tree_diff.py: both trees are compared by
+blob OID, renames are reported as such and modified terms list the
+fields that changed.
 """
 
 import argparse
-import collections
-import subprocess
+import json
 import sys
+from pathlib import Path
 
-# Paths excluded from CV change detection (infrastructure, docs, etc.)
-EXCLUDE_PATTERNS = [
-    ":(exclude)_src",
-    ":(exclude)_tests",
-    ":(exclude)_archive",
-    ":(exclude)scripts",
-    ":(exclude)*.md",
-    ":(exclude)*.toml",
-    ":(exclude)*.lock",
-    ":(exclude)*.py",
-    ":(exclude).github",
-    ":(exclude)LICENSE*",
-    ":(exclude).gitignore",
-    ":(exclude).pre-commit-config.yaml",
-    ":(exclude)esgvoc_manifest.yaml",
-]
-
-
-def get_diff(base_sha):
-    """Run git diff and return the name-status output."""
-    cmd = [
-        "git", "diff", "--name-status", "--diff-filter=ACDMR",
-        f"{base_sha}..HEAD", "--",
-    ] + EXCLUDE_PATTERNS
-
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-    return result.stdout.strip()
-
-
-def parse_diff(diff_output):
-    """Parse git diff name-status output into categorized changes."""
-    changes = collections.defaultdict(lambda: {"A": [], "M": [], "D": []})
-    model_changes = []
-    spec_changes = []
-
-    for line in diff_output.split("\n"):
-        if not line.strip():
-            continue
+# Spans come from the (stdlib only) helper in _scripts
+sys.path.append(str(Path(__file__).resolve().parents[2] / "_scripts"))
+from ci_tree_diff import diff_trees  # noqa: E402
+from instrument import span  # noqa: E402
 
-        parts = line.split("\t")
-
-        if parts[0].startswith(("R", "C")):
-            # Renames/copies: "R100\told/path\tnew/path" — treat as add of the new path
-            if len(parts) < 3:
-                continue
-            status = "A"
-            path = parts[2]
-        elif len(parts) >= 2:
-            status = parts[0]
-            path = parts[1]
-        else:
-            continue
+# Field-level details listed per collection before they are summarised
+MAX_DETAILS = 20
 
-        segments = path.split("/")
-        filename = segments[-1]
 
-        # Spec files at root level
-        if len(segments) == 1 and filename.endswith("_specs.yaml"):
-            action = "new" if status == "A" else "updated"
-            spec_changes.append((filename, action))
-            continue
+def _short(value, limit=60):
+    text = json.dumps(value) if not isinstance(value, str) else value
+    return text if len(text) <= limit else text[: limit - 1] + "…"
 
-        if len(segments) < 2:
-            continue
 
-        collection = segments[0]
-
-        if filename == "000_context.jsonld":
-            action = "new" if status == "A" else "updated"
-            model_changes.append((collection, action))
+def _describe_fields(changes):
+    parts = []
+    for field, kind, old, new in changes:
+        if kind == "changed" and field != "<content>":
+            parts.append(f"`{field}` {_short(old)} → {_short(new)}")
         else:
-            term_id = filename.replace(".json", "")
-            changes[collection][status[0]].append(term_id)
-
-    return spec_changes, model_changes, changes
+            parts.append(f"`{field}` {kind}")
+    return ", ".join(parts)
 
 
-def format_changelog(spec_changes, model_changes, term_changes):
-    """Format changes into markdown."""
+def format_changelog(diff, summary_only=False):
+    """Format a TreeDiff into markdown."""
     lines = []
 
-    for filename, action in spec_changes:
+    for filename, action in diff.specs:
         lines.append(f"- {filename}: {action}")
 
-    for collection, action in model_changes:
+    for collection, action in diff.models:
         lines.append(f"- {collection}: {action} collection model")
 
-    for collection in sorted(term_changes):
+    for collection in sorted(diff.terms):
+        changes = diff.terms[collection]
         parts = []
-        counts = term_changes[collection]
-        if counts["A"]:
-            parts.append(f'{len(counts["A"])} added')
-        if counts["M"]:
-            parts.append(f'{len(counts["M"])} modified')
-        if counts["D"]:
-            parts.append(f'{len(counts["D"])} removed')
-        if parts:
-            lines.append(f"- {collection}: {', '.join(parts)}")
+        if changes["added"]:
+            parts.append(f'{len(changes["added"])} added')
+        if changes["modified"]:
+            parts.append(f'{len(changes["modified"])} modified')
+        if changes["renamed"]:
+            parts.append(f'{len(changes["renamed"])} renamed')
+        if changes["removed"]:
+            parts.append(f'{len(changes["removed"])} removed')
+        if not parts:
+            continue
+        lines.append(f"- {collection}: {', '.join(parts)}")
+
+        if summary_only:
+            continue
+        details = []
+        for term_id, fields in changes["modified"]:
+            details.append(f"  - {term_id}: {_describe_fields(fields)}")
+        for old_id, new_id, fields in changes["renamed"]:
+            suffix = f" ({_describe_fields(fields)})" if fields else ""
+            details.append(f"  - {old_id} → {new_id}{suffix}")
+        if len(details) > MAX_DETAILS:
+            details = details[:MAX_DETAILS] + [f"  - … and {len(details) - MAX_DETAILS} more"]
+        lines.extend(details)
 
     return "\n".join(lines) if lines else "No CV changes."
 
@@ -115,15 +81,19 @@ def format_changelog(spec_changes, model_changes, term_changes):
 def main():
     parser = argparse.ArgumentParser(description="Generate changelog from git diff")
     parser.add_argument("base_sha", help="Base SHA to diff against")
+    parser.add_argument("--summary-only", action="store_true", help="Only list counts per collection")
+    parser.add_argument("--cache-dir", help="Cache the base tree snapshot in this directory")
     args = parser.parse_args()
 
-    diff_output = get_diff(args.base_sha)
-    if not diff_output:
+    with span("diff"):
+        diff = diff_trees(args.base_sha, "HEAD", cache_dir=args.cache_dir)
+    if not diff:
         print("No CV changes.")
         sys.exit(0)
 
-    spec_changes, model_changes, term_changes = parse_diff(diff_output)
-    print(format_changelog(spec_changes, model_changes, term_changes))
+    with span("format"):
+        changelog = format_changelog(diff, args.summary_only)
+    print(changelog)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+"""
+CI helper: structured diff of the CV files between two commits.
+
+Both trees are listed with one `git ls-tree` each and compared by blob
+OID, so unchanged files are never read. The blobs that did change are
+read with a single `git cat-file --batch`. Term files are compared field
+by field, and a term that moved to another file is reported as a rename
+(same blob, or same id in the same collection) instead of an add plus a
+remove.
+
+The base side (its path -> OID listing and the blobs read from it) can
+be cached on disk by commit, so repeated runs against the same base only
+list HEAD.
+"""
+
+import collections
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Spans and counters come from the (stdlib only) helper in _scripts
+sys.path.append(str(Path(__file__).resolve().parents[2] / "_scripts"))
+from instrument import count, span  # noqa: E402
+
+# Top-level directories that never hold collections
+EXCLUDED_DIRS = {"_src", "_tests", "_archive", "_CVs", "_scripts", "_build", "scripts"}
+
+CONTEXT_FILENAME = "000_context.jsonld"
+CACHE_VERSION = 1
+
+
+def is_cv_path(path):
+    """Spec files at the root, and collection contexts and terms."""
+    segments = path.split("/")
+    if len(segments) == 1:
+        return path.endswith("_specs.yaml")
+    top = segments[0]
+    if top in EXCLUDED_DIRS or top.startswith((".", "_")):
+        return False
+    return len(segments) == 2 and path.endswith((".json", ".jsonld"))
+
+
+def _git(*args, input=None):
+    with span("git", command=args[0]):
+        result = subprocess.run(["git", *args], input=input, capture_output=True, check=True)
+    count("git.calls")
+    return result.stdout
+
+
+def resolve(rev):
+    return _git("rev-parse", "--verify", f"{rev}^{{commit}}").decode().strip()
+
+
+def ls_tree(rev):
+    """Return {path: blob oid} for the CV files of a commit."""
+    tree = {}
+    for line in _git("ls-tree", "-r", "-z", "--full-tree", rev).split(b"\0"):
+        if not line:
+            continue
+        meta, path = line.split(b"\t", 1)
+        _, kind, oid = meta.split()
+        path = path.decode()
+        if kind == b"blob" and is_cv_path(path):
+            tree[path] = oid.decode()
+    return tree
+
+
+def read_blobs(oids):
+    """Return {oid: text} for the given blobs with one git cat-file call."""
+    oids = sorted(set(oids))
+    if not oids:
+        return {}
+    out = _git("cat-file", "--batch", input="".join(f"{oid}\n" for oid in oids).encode())
+    count("blobs_read", len(oids))
+    count("bytes_read", len(out))
+    blobs = {}
+    pos = 0
+    for oid in oids:
+        header_end = out.index(b"\n", pos)
+        _, _, size = out[pos:header_end].split()
+        start = header_end + 1
+        end = start + int(size)
+        blobs[oid] = out[start:end].decode("utf-8", errors="replace")
+        pos = end + 1
+    return blobs
+
+
+class BaseSnapshot:
+    """Tree listing and blob contents of the base commit, optionally cached on disk."""
+
+    def __init__(self, rev, cache_dir=None):
+        self.sha = resolve(rev)
+        self.path = Path(cache_dir) / f"{self.sha}.json" if cache_dir else None
+        self.dirty = False
+
+        cached = None
+        if self.path is not None and self.path.exists():
+            with open(self.path) as fh:
+                cached = json.load(fh)
+        if cached and cached.get("version") == CACHE_VERSION:
+            count("base_cache.hits")
+            self.tree = cached["tree"]
+            self.blobs = cached["blobs"]
+        else:
+            count("base_cache.misses")
+            self.tree = ls_tree(self.sha)
+            self.blobs = {}
+            self.dirty = True
+
+    def save(self):
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as fh:
+            json.dump({"version": CACHE_VERSION, "tree": self.tree, "blobs": self.blobs}, fh)
+        tmp.replace(self.path)
+
+
+def _load_term(text):
+    try:
+        content = json.loads(text)
+    except ValueError:
+        return None
+    return content if isinstance(content, dict) else None
+
+
+def diff_fields(old, new):
+    """Field-level changes between two term documents: [(field, kind, old, new)]."""
+    if old is None or new is None:
+        return [("<content>", "changed", None, None)]
+    changes = []
+    for field in sorted(set(old) | set(new)):
+        if field not in new:
+            changes.append((field, "removed", old[field], None))
+        elif field not in old:
+            changes.append((field, "added", None, new[field]))
+        elif old[field] != new[field]:
+            changes.append((field, "changed", old[field], new[field]))
+    return changes
+
+
+def _term_id(path):
+    return path.split("/")[-1].rsplit(".", 1)[0]
+
+
+class TreeDiff:
+    """Changes to specs, collection models and terms between two commits."""
+
+    def __init__(self):
+        self.specs = []  # (filename, "new" | "updated" | "removed")
+        self.models = []  # (collection, "new" | "updated" | "removed")
+        self.terms = collections.defaultdict(lambda: {"added": [], "removed": [], "modified": [], "renamed": []})
+        self.invalid = []  # term files of the head commit that do not parse to a JSON object
+
+    def __bool__(self):
+        return bool(self.specs or self.models or any(any(v.values()) for v in self.terms.values()))
+
+
+def diff_trees(base_rev, head_rev="HEAD", cache_dir=None):
+    """Compare the CV files of two commits; returns a TreeDiff."""
+    base = BaseSnapshot(base_rev, cache_dir)
+    head_tree = ls_tree(head_rev)
+
+    paths = set(base.tree) | set(head_tree)
+    changed = sorted(p for p in paths if base.tree.get(p) != head_tree.get(p))
+
+    # Read everything needed in at most two cat-file calls; base blobs are cached
+    base_missing = [base.tree[p] for p in changed if p in base.tree and base.tree[p] not in base.blobs]
+    if base_missing:
+        base.blobs.update(read_blobs(base_missing))
+        base.dirty = True
+    head_blobs = read_blobs(head_tree[p] for p in changed if p in head_tree)
+    base.save()
+
+    diff = TreeDiff()
+    added = {}
+    removed = {}
+    for path in changed:
+        old_oid, new_oid = base.tree.get(path), head_tree.get(path)
+        segments = path.split("/")
+        action = "new" if old_oid is None else "removed" if new_oid is None else "updated"
+
+        if len(segments) == 1:
+            diff.specs.append((path, action))
+        elif segments[1] == CONTEXT_FILENAME:
+            diff.models.append((segments[0], action))
+        elif old_oid is None:
+            added[path] = new_oid
+        elif new_oid is None:
+            removed[path] = old_oid
+        else:
+            new = _load_term(head_blobs[new_oid])
+            if new is None:
+                diff.invalid.append(path)
+            changes = diff_fields(_load_term(base.blobs[old_oid]), new)
+            diff.terms[segments[0]]["modified"].append((_term_id(path), changes))
+
+    # Renames: identical blob first, then same term id within the collection
+    by_oid = collections.defaultdict(list)
+    for path, oid in removed.items():
+        by_oid[oid].append(path)
+    by_id = {}
+    for path, oid in removed.items():
+        content = _load_term(base.blobs[oid])
+        if content and "id" in content:
+            by_id[(path.split("/")[0], content["id"])] = path
+
+    for path, oid in sorted(added.items()):
+        collection = path.split("/")[0]
+        content = _load_term(head_blobs[oid])
+        if content is None:
+            diff.invalid.append(path)
+        old_path = None
+        candidates = [p for p in by_oid.get(oid, []) if p in removed and p.split("/")[0] == collection]
+        if candidates:
+            old_path = candidates[0]
+        elif content and (collection, content.get("id")) in by_id:
+            old_path = by_id[(collection, content["id"])]
+            if old_path not in removed:
+                old_path = None
+
+        if old_path is None:
+            diff.terms[collection]["added"].append(_term_id(path))
+            continue
+        old_oid = removed.pop(old_path)
+        changes = [] if old_oid == oid else diff_fields(_load_term(base.blobs[old_oid]), content)
+        diff.terms[collection]["renamed"].append((_term_id(old_path), _term_id(path), changes))
+
+    for path in sorted(removed):
+        diff.terms[path.split("/")[0]]["removed"].append(_term_id(path))
+
+    return diff
@@ -5,12 +5,28 @@ Subcommands:
   fetch-current   Read registry JSON from stdin, print current stable version.
   fetch-universe  Read registry JSON from stdin, print current universe version.
   compute-next    Given --current and --bump, print the next semver version.
+  detect-bump     Given --base, classify the CV changes since that commit and
+                  print bump_type=/warning= lines (for $GITHUB_OUTPUT); the
+                  reason behind each change goes to stderr.
 """
 
 import argparse
 import json
 import sys
 
+from ci_tree_diff import diff_trees
+
+BUMP_LEVELS = ["none", "patch", "minor", "major"]
+
+# Specs that define the DRS and file attributes: any change can break
+# files that validated before
+BREAKING_SPECS = {"drs_specs.yaml", "attr_specs.yaml"}
+
+# Term fields that change what a term is or what it accepts; a change to
+# any other field (description, label, ...) is cosmetic
+IDENTITY_FIELDS = {"@context", "id", "type"}
+CONSTRAINT_FIELDS = {"regex"}
+
 
 def fetch_version(data):
     """Extract the latest non-prerelease, non-dev version from a registry index."""
@@ -54,6 +70,74 @@ def cmd_compute_next(args):
     print(".".join(str(p) for p in parts))
 
 
+def classify_term_edit(changes):
+    """Bump level and reason for the field changes of one term."""
+    fields = {field for field, _, _, _ in changes}
+    if "<content>" in fields:
+        # Head content that does not parse is an error (TreeDiff.invalid);
+        # here only the base side was broken, so the term is new in effect
+        return "minor", "base content did not parse; counted as an addition"
+    if fields & IDENTITY_FIELDS:
+        return "major", f"{', '.join(sorted(fields & IDENTITY_FIELDS))} changed"
+    if fields & CONSTRAINT_FIELDS:
+        return "minor", f"{', '.join(sorted(fields & CONSTRAINT_FIELDS))} changed"
+    return "patch", f"cosmetic: {', '.join(sorted(fields))}" if fields else "no field changes"
+
+
+def classify(diff):
+    """Return (bump, warning, decisions) for a TreeDiff; decisions are (level, subject, reason).
+
+    Raises ValueError when term files of the head commit do not parse.
+    """
+    if diff.invalid:
+        raise ValueError(f"term file(s) do not parse as a JSON object: {', '.join(sorted(diff.invalid))}")
+    decisions = []
+    warning = ""
+
+    for filename, action in diff.specs:
+        if filename in BREAKING_SPECS:
+            decisions.append(("major", filename, f"{action}: DRS/attribute rules changed"))
+        else:
+            decisions.append(("minor", filename, action))
+            warning = "Spec files changed — at minimum a minor bump, could warrant major if it breaks downstream tooling."
+
+    for collection, action in diff.models:
+        # A new collection is a new DRS/attribute source for consumers
+        level = {"new": "major", "updated": "minor", "removed": "major"}[action]
+        decisions.append((level, f"{collection}/000_context.jsonld", f"collection model {action}"))
+
+    for collection in sorted(diff.terms):
+        changes = diff.terms[collection]
+        for term_id in changes["removed"]:
+            decisions.append(("major", f"{collection}/{term_id}", "removed"))
+        for term_id in changes["added"]:
+            decisions.append(("minor", f"{collection}/{term_id}", "added"))
+        for term_id, fields in changes["modified"]:
+            level, reason = classify_term_edit(fields)
+            decisions.append((level, f"{collection}/{term_id}", reason))
+        for old_id, new_id, fields in changes["renamed"]:
+            level, reason = classify_term_edit(fields)
+            decisions.append((level, f"{collection}/{new_id}", f"file renamed from {old_id}; {reason}"))
+
+    bump = max((level for level, _, _ in decisions), key=BUMP_LEVELS.index, default="none")
+    return bump, warning, decisions
+
+
+def cmd_detect_bump(args):
+    try:
+        bump, warning, decisions = classify(diff_trees(args.base, "HEAD", cache_dir=args.cache_dir))
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    for level, subject, reason in sorted(decisions, key=lambda d: -BUMP_LEVELS.index(d[0])):
+        print(f"{level:5}  {subject}: {reason}", file=sys.stderr)
+    print(f"Detected bump type: {bump}", file=sys.stderr)
+
+    print(f"bump_type={bump}")
+    print(f"warning={warning}")
+
+
 def main():
     parser = argparse.ArgumentParser(description="CI version helper")
     sub = parser.add_subparsers(dest="command", required=True)
@@ -65,12 +149,17 @@ def main():
     next_parser.add_argument("--current", required=True, help="Current version (e.g. 1.2.3)")
     next_parser.add_argument("--bump", required=True, choices=["major", "minor", "patch"])
 
+    detect_parser = sub.add_parser("detect-bump", help="Classify the CV changes since a commit")
+    detect_parser.add_argument("--base", required=True, help="Base SHA to diff against")
+    detect_parser.add_argument("--cache-dir", help="Cache the base tree snapshot in this directory")
+
     args = parser.parse_args()
 
     commands = {
         "fetch-current": cmd_fetch_current,
         "fetch-universe": cmd_fetch_universe,
         "compute-next": cmd_compute_next,
+        "detect-bump": cmd_detect_bump,
     }
     commands[args.command](args)
 
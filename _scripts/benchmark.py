@@ -0,0 +1,328 @@
+"""
+Benchmarks for loading the CVs, looking up terms and validating DRS names.
+
+Corpora are generated from the real collections with a fixed seed, so a
+run only changes when the code or the collections change. Each run is
+appended to a JSON history together with the commit it was taken at;
+`compare` reports the benchmarks that slowed down between two commits.
+
+Usage:
+  python _scripts/benchmark.py run [--size N] [--repeat N] [--only NAME ...]
+  python _scripts/benchmark.py compare BASE_SHA [HEAD_SHA] [--threshold 0.1]
+  python _scripts/benchmark.py list
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from cv_bundle import CVBundle, build_bundle
+from cv_common import (
+    BUILD_DIR,
+    CONTEXT_FILENAME,
+    REPO_ROOT,
+    iter_collection_dirs,
+    iter_term_files,
+    load_json,
+    load_yaml,
+)
+from cv_store import CVStore
+from drs_parse import DrsParser
+from drs_validate import DrsValidator, load_drs_names
+
+
+HISTORY_PATH = BUILD_DIR / "benchmark_history.json"
+SEED = 20250101
+INVALID_RATIO = 0.05
+
+
+def load_all_collections(repo_root=REPO_ROOT):
+    """Parse every context and term file: {collection: {id: term}}."""
+    collections = {}
+    for name, path in iter_collection_dirs(repo_root):
+        load_json(path / CONTEXT_FILENAME)
+        collections[name] = {
+            term.get("id", f.stem): term for f in iter_term_files(path) for term in [load_json(f)]
+        }
+    return collections
+
+
+def _load_check_script():
+    spec = importlib.util.spec_from_file_location(
+        "check_cv_entry_filenames", Path(__file__).with_name("check-cv-entry-filenames.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Corpus:
+    """Synthetic DRS names built from the drs_names of the real collections."""
+
+    def __init__(self, collections, size, seed=SEED):
+        self.rng = random.Random(seed)
+        self.drs_names = {c: sorted(load_drs_names(c).values()) for c in collections}
+        self.size = size
+
+    def _value(self, collection):
+        if collection == "version":
+            return f"v{self.rng.randint(2000, 2030)}{self.rng.randint(1, 12):02d}{self.rng.randint(1, 28):02d}"
+        return self.rng.choice(self.drs_names[collection])
+
+    def _names(self, build, invalid):
+        names = [build() for _ in range(self.size)]
+        for i in self.rng.sample(range(self.size), int(self.size * INVALID_RATIO)):
+            names[i] = invalid(names[i])
+        return names
+
+    def filenames(self):
+        def build():
+            start = self.rng.randint(1850, 2020)
+            parts = [self._value(c) for c in ("variable_id", "frequency", "source_id", "variant_label", "grid_label")]
+            parts.append(f"{start}01-{start + self.rng.randint(0, 10)}12")
+            return "_".join(parts) + ".nc"
+
+        return self._names(build, lambda name: "xx" + name)
+
+    def dataset_parts(self, parts):
+        def build():
+            return [self._value(p["source_collection"]) for p in parts]
+
+        return self._names(build, lambda values: values[:2] + ["unknown-source"] + values[3:])
+
+
+def _setup(size):
+    collections = load_all_collections()
+    drs_specs = load_yaml(REPO_ROOT / "drs_specs.yaml")
+    corpus = Corpus(collections, size)
+    return collections, drs_specs, corpus
+
+
+def bench_cold_load(ctx):
+    return lambda: load_all_collections()
+
+
+def bench_term_lookup(ctx):
+    collections = ctx["collections"]
+    keys = [(c, t) for c, terms in collections.items() for t in terms]
+    return lambda: sum(1 for c, t in keys if t in collections[c])
+
+
+def bench_bundle_lookup(ctx):
+    path = build_bundle(BUILD_DIR / "benchmark.cvb")
+    bundle = CVBundle(path)
+    keys = [(c, t) for c, terms in ctx["collections"].items() for t in terms]
+    return lambda: sum(1 for c, t in keys if bundle.get_raw(c, t) is not None)
+
+
+def bench_lazy_lookup(ctx):
+    # A fresh store each time: discovery plus the three collections touched
+    keys = [(c, t) for c in ("source_id", "variable_id", "frequency") for t in ctx["collections"][c]]
+
+    def run():
+        store = CVStore()
+        return sum(1 for c, t in keys if store.get(c, t) is not None)
+
+    return run
+
+
+def bench_filename_validation(ctx):
+    names = ctx["corpus"].filenames()
+
+    def run():
+        # A fresh validator, so the head memo does not carry over between repeats
+        return sum(1 for _ in DrsValidator("file_name", ctx["drs_specs"]).validate(names, True))
+
+    return run
+
+
+def bench_dataset_id_validation(ctx):
+    parts = ctx["drs_specs"]["dataset_id"]["parts"]
+    ids = [".".join(values) for values in ctx["corpus"].dataset_parts(parts)]
+
+    def run():
+        return sum(1 for _ in DrsParser("dataset_id", ctx["drs_specs"]).parse_many(ids, True))
+
+    return run
+
+
+def bench_directory_validation(ctx):
+    parts = ctx["drs_specs"]["directory"]["parts"]
+    paths = ["/archive/" + "/".join(values) for values in ctx["corpus"].dataset_parts(parts)]
+
+    def run():
+        return sum(1 for _ in DrsParser("directory", ctx["drs_specs"]).parse_many(paths, True))
+
+    return run
+
+
+def bench_duplicate_ids(ctx):
+    check = _load_check_script()
+    return lambda: check.scan_ids(REPO_ROOT)
+
+
+BENCHMARKS = {
+    "cold_load": bench_cold_load,
+    "term_lookup": bench_term_lookup,
+    "bundle_lookup": bench_bundle_lookup,
+    "lazy_lookup": bench_lazy_lookup,
+    "filename_validation": bench_filename_validation,
+    "dataset_id_validation": bench_dataset_id_validation,
+    "directory_validation": bench_directory_validation,
+    "duplicate_ids": bench_duplicate_ids,
+}
+
+
+def git_revision():
+    sha = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    dirty = subprocess.run(
+        ["git", "status", "--porcelain", "--untracked-files=no"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    return sha, bool(dirty)
+
+
+def run_benchmarks(names, size, repeat):
+    collections, drs_specs, corpus = _setup(size)
+    ctx = {"collections": collections, "drs_specs": drs_specs, "corpus": corpus}
+
+    results = {}
+    for name in names:
+        fn = BENCHMARKS[name](ctx)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        results[name] = {"min": min(timings), "median": statistics.median(timings), "repeat": repeat}
+        print(f"{name:24} min {min(timings) * 1e3:10.2f} ms   median {statistics.median(timings) * 1e3:10.2f} ms")
+    return results
+
+
+def resolve_commit(ref):
+    """Full sha for a ref such as HEAD or main; unknown refs are used as sha prefixes."""
+    result = subprocess.run(
+        ["git", "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    return result.stdout.strip() or ref
+
+
+def load_history(path):
+    if not Path(path).exists():
+        return []
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def find_run(history, sha):
+    """Most recent run whose commit starts with sha."""
+    for run in reversed(history):
+        if run["commit"].startswith(sha):
+            return run
+    return None
+
+
+def compare_runs(base, head, threshold):
+    """Return (lines, regressions) comparing the min timings of two runs."""
+    lines = []
+    regressions = []
+    for name in sorted(set(base["results"]) & set(head["results"])):
+        before = base["results"][name]["min"]
+        after = head["results"][name]["min"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        lines.append(f"{name:24} {before * 1e3:10.2f} ms -> {after * 1e3:10.2f} ms  {change:+7.1%}{flag}")
+    return lines, regressions
+
+
+def cmd_run(args):
+    names = args.only or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        print(f"error: unknown benchmark(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        sys.exit(1)
+
+    sha, dirty = git_revision()
+    results = run_benchmarks(names, args.size, args.repeat)
+
+    history = load_history(args.history)
+    history.append({
+        "commit": sha,
+        "dirty": dirty,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "size": args.size,
+        "results": results,
+    })
+    Path(args.history).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.history, "w") as fh:
+        json.dump(history, fh, indent=2)
+    print(f"Recorded run for {sha[:12]}{' (dirty)' if dirty else ''} in {args.history}")
+
+
+def cmd_compare(args):
+    history = load_history(args.history)
+    base_sha = resolve_commit(args.base)
+    head_sha = resolve_commit(args.head or "HEAD")
+    base, head = find_run(history, base_sha), find_run(history, head_sha)
+    for sha, run in ((args.base, base), (args.head or "HEAD", head)):
+        if run is None:
+            print(f"error: no benchmark run recorded for {sha}", file=sys.stderr)
+            sys.exit(1)
+
+    lines, regressions = compare_runs(base, head, args.threshold)
+    print(f"{base['commit'][:12]} -> {head['commit'][:12]}")
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+def cmd_list(args):
+    for name in BENCHMARKS:
+        print(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CV tooling")
+    parser.add_argument("--history", default=str(HISTORY_PATH), help="History file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmarks and record them")
+    run_parser.add_argument("--size", type=int, default=100_000, help="Names per synthetic corpus")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--only", nargs="+", metavar="NAME")
+
+    compare_parser = sub.add_parser("compare", help="Compare two recorded commits")
+    compare_parser.add_argument("base", help="Base commit, ref or sha prefix")
+    compare_parser.add_argument("head", nargs="?", help="Head commit, ref or sha prefix (default: HEAD)")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown to flag")
+
+    sub.add_parser("list", help="List the benchmarks")
+
+    args = parser.parse_args()
+
+    commands = {
+        "run": cmd_run,
+        "compare": cmd_compare,
+        "list": cmd_list,
+    }
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,41 +3,190 @@ Check for duplicate term IDs within each collection.
 
 The id field references a universe term and does not have to match the
 filename, but two files in the same collection must never share the
-same id — that causes duplicate rows during esgvoc ingestion.
+same id — that causes duplicate rows during esgvoc ingestion. Every
+directory outside the tooling ones is checked, including one that has
+lost (or not yet got) its 000_context.jsonld.
+
+With --incremental, the id of every term file is kept in a cache keyed on
+(path, mtime, size, hash) and only files whose stat changed are read
+again (and only re-parsed if their content hash changed). --changed
+restricts even the stat calls to the given paths, so only those files
+are read; the cache itself is still loaded, rewritten and turned into
+the id maps as a whole, so a run stays linear in the number of terms
+(a few ms for the current tree). For example:
+
+  git diff --name-only origin/main | python _scripts/check-cv-entry-filenames.py --changed-from -
 """
 
+import argparse
+import hashlib
 import json
 import os
 import sys
 from collections import defaultdict
 from pathlib import Path
 
+from cv_common import BUILD_DIR, iter_collection_dirs, iter_term_files
+from instrument import count, span
 
-SKIP_DIRS = {".git", ".github", ".idea", ".venv", "_CVs", "_scripts"}
 
+CACHE_PATH = BUILD_DIR / "id_cache.json"
+CACHE_VERSION = 1
 
-def main():
-    repo_root = Path(__file__).parents[1]
 
-    failing = []
-    for entry in sorted(os.scandir(repo_root), key=lambda e: e.name):
-        if not entry.is_dir() or entry.name in SKIP_DIRS or entry.name.startswith("."):
-            continue
+def read_term_id(data):
+    return json.loads(data).get("id")
+
+
+class IdCache:
+    """Persisted map of term file -> (mtime_ns, size, hash, id)."""
 
+    def __init__(self, path, repo_root):
+        self.path = Path(path)
+        self.repo_root = repo_root
+        self.entries = {}
+        self.parsed = 0
+        if self.path.exists():
+            with open(self.path) as fh:
+                cached = json.load(fh)
+            if cached.get("version") == CACHE_VERSION:
+                self.entries = cached["files"]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with span("write_cache"), open(tmp, "w") as fh:
+            json.dump({"version": CACHE_VERSION, "files": self.entries}, fh)
+        tmp.replace(self.path)
+
+    def refresh(self, rel_path):
+        """Bring the entry of one term file up to date with the tree."""
+        full_path = self.repo_root / rel_path
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            self.entries.pop(rel_path, None)
+            return
+
+        entry = self.entries.get(rel_path)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            count("id_cache.hits")
+            return
+
+        count("id_cache.misses")
+        data = full_path.read_bytes()
+        count("files_read")
+        count("bytes_parsed", len(data))
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if entry and entry["hash"] == digest:
+            term_id = entry["id"]
+        else:
+            term_id = read_term_id(data)
+            self.parsed += 1
+        self.entries[rel_path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": digest,
+            "id": term_id,
+        }
+
+    def refresh_all(self):
+        seen = set()
+        for name, path in iter_collection_dirs(self.repo_root, require_context=False):
+            with span("discover", collection=name):
+                term_files = iter_term_files(path)
+            for cv_file in term_files:
+                rel_path = f"{name}/{cv_file.name}"
+                seen.add(rel_path)
+                self.refresh(rel_path)
+        for rel_path in set(self.entries) - seen:
+            del self.entries[rel_path]
+
+    def ids_by_collection(self):
+        collections = defaultdict(lambda: defaultdict(list))
+        for rel_path, entry in self.entries.items():
+            if entry["id"] is None:
+                continue
+            collection = rel_path.split("/", 1)[0]
+            collections[collection][entry["id"]].append(str(self.repo_root / rel_path))
+        return collections
+
+
+def term_file_paths(paths, repo_root):
+    """Keep the repo-relative paths of term files, e.g. from git diff --name-only."""
+    collections = {name for name, _ in iter_collection_dirs(repo_root, require_context=False)}
+    rel_paths = set()
+    for path in paths:
+        path = Path(path)
+        if path.is_absolute():
+            try:
+                path = path.relative_to(repo_root)
+            except ValueError:
+                continue
+        parts = path.parts
+        if len(parts) == 2 and parts[1].endswith(".json"):
+            # Deleted collections still need their entries dropped
+            if parts[0] in collections or not (repo_root / parts[0]).exists():
+                rel_paths.add("/".join(parts))
+    return rel_paths
+
+
+def scan_ids(repo_root):
+    """Full scan without a cache: {collection: {id: [files]}}."""
+    collections = {}
+    for name, path in iter_collection_dirs(repo_root, require_context=False):
         ids_seen: dict[str, list[str]] = defaultdict(list)
-        for cv_file in sorted(Path(entry.path).glob("*.json")):
-            with open(cv_file) as fh:
-                content = json.load(fh)
+        with span("discover", collection=name):
+            term_files = iter_term_files(path)
+        for cv_file in term_files:
+            with span("parse"), open(cv_file, "rb") as fh:
+                data = fh.read()
+                content = json.loads(data)
+            count("files_read")
+            count("bytes_parsed", len(data))
 
             if "id" not in content:
                 continue
 
             ids_seen[content["id"]].append(str(cv_file))
+        collections[name] = ids_seen
+    return collections
+
 
-        for term_id, files in ids_seen.items():
+def main():
+    parser = argparse.ArgumentParser(description="Check for duplicate term IDs within each collection")
+    parser.add_argument("--incremental", action="store_true", help="Only re-read files changed since the last run")
+    parser.add_argument("--changed", nargs="*", default=[], metavar="PATH", help="Only look at these paths")
+    parser.add_argument("--changed-from", metavar="FILE", help="File (or -) listing changed paths, one per line")
+    parser.add_argument("--cache", default=str(CACHE_PATH), help="Cache file (default: %(default)s)")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).parents[1]
+
+    changed = list(args.changed)
+    if args.changed_from:
+        fh = sys.stdin if args.changed_from == "-" else open(args.changed_from)
+        changed.extend(line.strip() for line in fh if line.strip())
+
+    if args.incremental or args.changed or args.changed_from:
+        cache = IdCache(args.cache, repo_root)
+        if (args.changed or args.changed_from) and cache.entries:
+            for rel_path in term_file_paths(changed, repo_root):
+                cache.refresh(rel_path)
+        else:
+            cache.refresh_all()
+        cache.save()
+        print(f"Parsed {cache.parsed} of {len(cache.entries)} term files.")
+        collections = cache.ids_by_collection()
+    else:
+        collections = scan_ids(repo_root)
+
+    failing = []
+    for name in sorted(collections):
+        for term_id, files in collections[name].items():
             if len(files) > 1:
                 failing.append(
-                    f"{entry.name}: duplicate id '{term_id}' in {files}"
+                    f"{name}: duplicate id '{term_id}' in {sorted(files)}"
                 )
 
     if failing:
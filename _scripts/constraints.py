@@ -0,0 +1,268 @@
+"""
+Cross-collection constraints: which variables, institutions, regions and
+source types go with each source_id.
+
+The DRS checks every part on its own, so ts_mon_AIRS-1-0_... passes even
+though AIRS-1-0 only provides hus and ta. The source records of
+_CVs/obs4MIPs_source_id.json say what each source provides; this module
+turns them into a compact artefact, _CVs/obs4REF_constraints.json, that
+is built once and shipped with the collections:
+
+  codes    the term ids of each constrained collection, in code order
+  sources  per source_id term, one bitset (hex) per collection, bit i set
+           when codes[collection][i] is allowed
+
+Record values are matched to term ids ignoring case, spaces and
+underscores ("global ocean" is global_ocean). Values that still match no
+term are kept under "unmatched" in the artefact; no DRS name can use
+them, as they are not terms of the collection. Sources without a record
+are listed as unconstrained. At load time the
+bitsets become a uint64 matrix per collection (sources x words), so a
+batch of combinations is checked with a few numpy gathers and shifts.
+
+Usage:
+  python _scripts/constraints.py build [--output PATH] [--strict]
+  python _scripts/constraints.py check [NAMES_FILE|-] [--drs file_name|dataset_id|directory]
+"""
+
+import argparse
+import collections
+import json
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from cv_common import REPO_ROOT, load_json, load_term_ids, load_yaml
+from drs_validate import read_names
+
+
+ARTEFACT_PATH = REPO_ROOT / "_CVs" / "obs4REF_constraints.json"
+SOURCE_RECORDS_PATH = REPO_ROOT / "_CVs" / "obs4MIPs_source_id.json"
+ARTEFACT_FORMAT = "obs4ref-constraints/1"
+
+# Constrained collection -> field of the source record
+RECORD_FIELDS = {
+    "variable_id": "source_variables",
+    "institution_id": "institution_id",
+    "region": "region",
+    "source_type": "source_type",
+}
+
+
+_IGNORED_IN_KEYS = re.compile(r"[\s_]")
+
+
+def match_key(value):
+    """Key matching record values to term ids: case, spaces and underscores are ignored."""
+    return _IGNORED_IN_KEYS.sub("", value.lower())
+
+
+def _positions(collection, ids):
+    positions = {}
+    for i, term_id in enumerate(ids):
+        key = match_key(term_id)
+        if key in positions:
+            raise ValueError(f"{collection}: {ids[positions[key]]!r} and {term_id!r} have the same key {key!r}")
+        positions[key] = i
+    return positions
+
+
+def build_constraints(records_path=SOURCE_RECORDS_PATH, repo_root=REPO_ROOT):
+    """Return the artefact built from the collections and the source records."""
+    codes = {c: sorted(i.lower() for i in load_term_ids(c, repo_root)) for c in RECORD_FIELDS}
+    positions = {c: _positions(c, ids) for c, ids in codes.items()}
+    records = {k.lower(): v for k, v in load_json(records_path)["source_id"].items()}
+
+    sources = {}
+    unconstrained = []
+    unmatched = collections.defaultdict(dict)
+    # Every source with a record, plus the source_id terms that lack one
+    for source in sorted(set(records) | {i.lower() for i in load_term_ids("source_id", repo_root)}):
+        record = records.get(source)
+        if record is None:
+            unconstrained.append(source)
+            continue
+        masks = {}
+        for collection, field in RECORD_FIELDS.items():
+            values = record.get(field, [])
+            mask = 0
+            for value in [values] if isinstance(values, str) else values:
+                code = positions[collection].get(match_key(value))
+                if code is None:
+                    unmatched[source].setdefault(collection, []).append(value)
+                else:
+                    mask |= 1 << code
+            masks[collection] = format(mask, "x")
+        sources[source] = masks
+
+    artefact = {
+        "format": ARTEFACT_FORMAT,
+        "codes": codes,
+        "sources": sources,
+        "unconstrained": unconstrained,
+        "unmatched": dict(unmatched),
+    }
+    return artefact
+
+
+class ConstraintMatrix:
+    """Loaded constraints, as uint64 bit matrices per collection."""
+
+    def __init__(self, artefact):
+        if artefact.get("format") != ARTEFACT_FORMAT:
+            raise ValueError("not a constraints artefact")
+        self.codes = {c: {term_id: i for i, term_id in enumerate(ids)} for c, ids in artefact["codes"].items()}
+        self.sources = {s: i for i, s in enumerate(sorted(artefact["sources"]))}
+        self.unconstrained = frozenset(artefact["unconstrained"])
+
+        self.bits = {}
+        for collection, ids in artefact["codes"].items():
+            words = max(1, (len(ids) + 63) // 64)
+            matrix = np.zeros((len(self.sources), words), dtype=np.uint64)
+            for source, row in self.sources.items():
+                mask = int(artefact["sources"][source][collection], 16)
+                for w in range(words):
+                    matrix[row, w] = (mask >> (64 * w)) & 0xFFFFFFFFFFFFFFFF
+            self.bits[collection] = matrix
+
+    @classmethod
+    def load(cls, path=ARTEFACT_PATH):
+        return cls(load_json(path))
+
+    @property
+    def collections(self):
+        return list(self.codes)
+
+    def _encode(self, mapping, values):
+        return np.fromiter((mapping.get(v.lower(), -1) for v in values), dtype=np.int64, count=len(values))
+
+    def allowed(self, sources, collection, values):
+        """Boolean mask: is values[i] allowed for sources[i]?
+
+        Unconstrained sources allow everything; unknown sources and values
+        are not allowed (the DRS check reports those).
+        """
+        rows = self._encode(self.sources, sources)
+        cols = self._encode(self.codes[collection], values)
+        known = (rows >= 0) & (cols >= 0)
+        result = np.zeros(len(rows), dtype=bool)
+        r, c = rows[known], cols[known]
+        words = self.bits[collection][r, c >> 6]
+        result[known] = ((words >> (c & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+        free = np.fromiter((s.lower() in self.unconstrained for s in sources), dtype=bool, count=len(rows))
+        return result | free
+
+    def known(self, sources):
+        """Boolean mask: is sources[i] in the artefact?"""
+        return np.fromiter(
+            (s.lower() in self.sources or s.lower() in self.unconstrained for s in sources),
+            dtype=bool,
+            count=len(sources),
+        )
+
+    def check(self, sources, **values):
+        """{collection: mask} for each constrained collection given as a keyword."""
+        return {collection: self.allowed(sources, collection, v) for collection, v in values.items()}
+
+
+def split_names(names, drs_type, collections_, drs_specs=None, repo_root=REPO_ROOT):
+    """Columns {collection: [values]} of the given collections from DRS names."""
+    if drs_specs is None:
+        drs_specs = load_yaml(repo_root / "drs_specs.yaml")
+    spec = drs_specs[drs_type]
+    parts = [p["source_collection"] for p in spec["parts"]]
+    wanted = {c: parts.index(c) for c in ["source_id", *collections_] if c in parts}
+    columns = collections.defaultdict(list)
+    for name in names:
+        if drs_type == "file_name":
+            name = name.rsplit(".", 1)[0]
+        values = name.strip(spec["separator"]).split(spec["separator"])
+        if drs_type == "directory":
+            # Anchor on the last len(parts) components of the path
+            values = values[-len(parts):]
+        for collection, i in wanted.items():
+            columns[collection].append(values[i] if i < len(values) else "")
+    return columns
+
+
+def cmd_build(args):
+    try:
+        artefact = build_constraints()
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    n_unmatched = sum(len(v) for by_collection in artefact["unmatched"].values() for v in by_collection.values())
+    if n_unmatched:
+        for source, by_collection in sorted(artefact["unmatched"].items()):
+            for collection, values in sorted(by_collection.items()):
+                print(f"{source}: not {collection} terms: {', '.join(values)}", file=sys.stderr)
+        if args.strict:
+            print(f"error: {n_unmatched} record value(s) match no term", file=sys.stderr)
+            sys.exit(1)
+    output = Path(args.output)
+    with open(output, "w") as fh:
+        json.dump(artefact, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    print(
+        f"Wrote {output}: {len(artefact['sources'])} constrained source(s), "
+        f"{len(artefact['unconstrained'])} unconstrained, {n_unmatched} unmatched value(s) recorded"
+    )
+
+
+def cmd_check(args):
+    fh = sys.stdin if args.names == "-" else open(args.names)
+    names = list(read_names(fh))
+    if fh is not sys.stdin:
+        fh.close()
+
+    matrix = ConstraintMatrix.load(args.constraints)
+    columns = split_names(names, args.drs, matrix.collections)
+    if "source_id" not in columns:
+        print(f"error: {args.drs} names have no source_id part", file=sys.stderr)
+        sys.exit(1)
+    sources = columns.pop("source_id")
+    masks = matrix.check(sources, **columns)
+    known = matrix.known(sources)
+
+    failed = 0
+    for i, name in enumerate(names):
+        if not known[i]:
+            failed += 1
+            print(f"{name}\tFAIL\tno constraints for source_id {sources[i]!r}")
+            continue
+        bad = [c for c, mask in masks.items() if not mask[i]]
+        if bad:
+            failed += 1
+            details = ", ".join(f"{c} {columns[c][i]!r}" for c in bad)
+            print(f"{name}\tFAIL\t{sources[i]} does not provide {details}")
+    if failed:
+        print(f"{failed} of {len(names)} name(s) break a source constraint", file=sys.stderr)
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Source_id constraints across collections")
+    parser.add_argument("--constraints", default=str(ARTEFACT_PATH), help="Artefact (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="Build the constraints artefact")
+    build_parser.add_argument("--output", default=str(ARTEFACT_PATH))
+    build_parser.add_argument("--strict", action="store_true", help="Fail if a record value matches no term")
+
+    check_parser = sub.add_parser("check", help="Check DRS names against the constraints")
+    check_parser.add_argument("names", nargs="?", default="-", help="File of names, one per line (default: stdin)")
+    check_parser.add_argument("--drs", default="file_name", choices=["file_name", "dataset_id", "directory"])
+
+    args = parser.parse_args()
+
+    commands = {
+        "build": cmd_build,
+        "check": cmd_check,
+    }
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
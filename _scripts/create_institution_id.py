@@ -2,8 +2,8 @@ import json
 import os
 from pathlib import Path
 
-import esgvoc.api as ev
-import requests
+from fetch import fetch_json
+from universe import TermIndex
 
 # URLs of the JSON files on GitHub
 json_url = "https://raw.githubusercontent.com/PCMDI/obs4MIPs-cmor-tables/refs/heads/master/obs4MIPs_institution_id.json"
@@ -15,34 +15,14 @@ save_dir = "obs4MIPs_institution_id"
 os.makedirs(save_dir, exist_ok=True)
 
 
-# Function to fetch and load JSON data from a URL
-def fetch_json(url):
-    response = requests.get(url)
-    response.raise_for_status()  # Check for request errors
-    return response.json()
-
-
 data = fetch_json(json_url)["institution_id"]
 
-known_institutions_in_universe = ev.get_all_terms_in_data_descriptor("institution")
-# print(known_institutions_in_universe)
+# Institutions not in the universe may be known as a consortium or an
+# organisation; the institution entry wins when a name is in several
+known_institutions_in_universe = TermIndex("institution", "consortium", "organisation")
 for item in data:
     print(item)
-    found_inst = None
-    for inst in known_institutions_in_universe:
-        if inst.drs_name == item:
-            found_inst = inst
-            break
-    if found_inst is None:
-        for consor in ev.get_all_terms_in_data_descriptor("consortium"):
-            if consor.drs_name == item.upper():
-                found_inst = consor
-                break
-    if found_inst is None:
-        for orga in ev.get_all_terms_in_data_descriptor("organisation"):
-            if orga.drs_name == item:
-                found_inst = orga
-                break
+    found_inst = known_institutions_in_universe.get(item)
 
     if found_inst is None:
         print(item, "not found in universe")
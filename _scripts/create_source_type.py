@@ -2,8 +2,8 @@ import json
 import os
 from pathlib import Path
 
-import esgvoc.api as ev
-import requests
+from fetch import fetch_json
+from universe import TermIndex
 
 # URLs of the JSON files on GitHub
 json_url = "https://raw.githubusercontent.com/PCMDI/obs4MIPs-cmor-tables/refs/heads/master/obs4MIPs_source_type.json"
@@ -15,23 +15,11 @@ save_dir = "obs4MIPs_source_type"
 os.makedirs(save_dir, exist_ok=True)
 
 
-# Function to fetch and load JSON data from a URL
-def fetch_json(url):
-    response = requests.get(url)
-    response.raise_for_status()  # Check for request errors
-    return response.json()
-
-
 data = fetch_json(json_url)["source_type"]
 
-known_sources_in_universe = ev.get_all_terms_in_data_descriptor("obs_type")
-print(known_sources_in_universe)
+known_sources_in_universe = TermIndex("obs_type")
 for item in data:
-    found_item = None
-    for sour in known_sources_in_universe:
-        if sour.drs_name == item:
-            found_item = sour
-            break
+    found_item = known_sources_in_universe.get(item)
 
     if found_item is None:
         print(item, "not found in universe")
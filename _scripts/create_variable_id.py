@@ -2,8 +2,8 @@ import json
 import os
 from pathlib import Path
 
-import esgvoc.api as ev
-import requests
+from fetch import fetch_json, fetch_json_many
+from universe import TermIndex
 
 # Directory of CMOR Table to retrieve variable_id
 table_dir_url = (
@@ -17,17 +17,10 @@ save_dir = "obs4MIPs_variable_id"
 os.makedirs(save_dir, exist_ok=True)
 
 
-# Function to fetch and load JSON data from a URL
-def fetch_json(url):
-    response = requests.get(url)
-    response.raise_for_status()  # Check for request errors
-    return response.json()
-
-
 variables_list = []
 data = fetch_json(table_dir_url)
-for item in data:
-    json_data = fetch_json(item["download_url"])
+tables = fetch_json_many(item["download_url"] for item in data)
+for item, json_data in zip(data, tables):
     print(item["name"])
     # print(json_data.keys())
     if "variable_entry" in json_data.keys():
@@ -54,13 +47,9 @@ variables_list_flat = remove_duplicate(flatten(variables_list[:-1]))
 print(variables_list_flat)
 
 
-known_variables_in_universe = ev.get_all_terms_in_data_descriptor("variable")
+known_variables_in_universe = TermIndex("variable")
 for item in variables_list_flat:
-    found_item = None
-    for sour in known_variables_in_universe:
-        if sour.drs_name == item:
-            found_item = sour
-            break
+    found_item = known_variables_in_universe.get(item)
 
     if found_item is None:
         print(item, "NOT found in universe")
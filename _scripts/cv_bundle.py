@@ -0,0 +1,298 @@
+"""
+Compile the CV collections and specs into one memory-mappable bundle.
+
+Loading the vocabulary from the tree means opening and parsing every term
+file of every collection. The bundle stores the same content in a single
+file with a sorted fixed-width index, so a term can be looked up by
+(collection, id) with a binary search over the mapped file instead.
+
+Layout (little endian):
+
+  magic        8 bytes   b"O4RCVB\\x00\\x01"
+  header_len   uint32
+  header       JSON      cv_version, universe_version, section offsets, ...
+  index        n * 16    (key_offset, key_len, value_offset, value_len)
+  keys         bytes     b"<collection>\\x00<id>", sorted
+  values       bytes     minified JSON documents
+
+Besides the terms, each collection carries its context under the id
+"@context" and the spec files live in the "@specs" pseudo-collection.
+
+Usage:
+  python _scripts/cv_bundle.py build [--output PATH]
+  python _scripts/cv_bundle.py get <collection> <id> [--bundle PATH]
+  python _scripts/cv_bundle.py info [--bundle PATH]
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+
+from cv_common import (
+    BUILD_DIR,
+    CONTEXT_FILENAME,
+    REPO_ROOT,
+    iter_collection_dirs,
+    iter_term_files,
+    load_json,
+    load_manifest,
+    load_specs,
+)
+
+
+MAGIC = b"O4RCVB\x00\x01"
+FORMAT_VERSION = 1
+INDEX_RECORD = struct.Struct("<IIII")
+HEADER_LEN = struct.Struct("<I")
+
+CONTEXT_ID = "@context"
+SPECS_COLLECTION = "@specs"
+
+
+def default_bundle_path(cv_version):
+    return BUILD_DIR / f"obs4ref-cv-{cv_version}.cvb"
+
+
+def _encode_key(collection, term_id):
+    return f"{collection}\x00{term_id}".encode()
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def collect_entries(repo_root=REPO_ROOT):
+    """Return {(collection, id): document} for every term, context and spec."""
+    entries = {}
+    for name, path in iter_collection_dirs(repo_root):
+        entries[(name, CONTEXT_ID)] = load_json(path / CONTEXT_FILENAME)
+        for term_file in iter_term_files(path):
+            content = load_json(term_file)
+            term_id = content.get("id", term_file.stem)
+            if (name, term_id) in entries:
+                raise ValueError(f"{name}: duplicate id '{term_id}' ({term_file})")
+            entries[(name, term_id)] = content
+
+    for spec_name, spec in load_specs(repo_root).items():
+        entries[(SPECS_COLLECTION, spec_name)] = spec
+
+    return entries
+
+
+def build_bundle(output=None, repo_root=REPO_ROOT):
+    """Compile the tree into a bundle and return the path written."""
+    manifest = load_manifest(repo_root)
+    output = Path(output) if output else default_bundle_path(manifest["cv_version"])
+
+    entries = sorted(
+        (_encode_key(*key), _dumps(doc)) for key, doc in collect_entries(repo_root).items()
+    )
+
+    index = bytearray()
+    keys = bytearray()
+    values = bytearray()
+    for key, value in entries:
+        index += INDEX_RECORD.pack(len(keys), len(key), len(values), len(value))
+        keys += key
+        values += value
+
+    collections = sorted({key.split(b"\x00", 1)[0].decode() for key, _ in entries})
+
+    # Offsets depend on the header length, so settle them on a fixed-width
+    # placeholder first and then fill in the real values
+    header = {
+        "format": FORMAT_VERSION,
+        "project_id": manifest["project"]["id"],
+        "cv_version": manifest["cv_version"],
+        "universe_version": manifest["universe_version"],
+        "collections": collections,
+        "n_entries": len(entries),
+        "index_offset": 0,
+        "keys_offset": 0,
+        "values_offset": 0,
+    }
+    widest = {k: 10**12 for k in ("index_offset", "keys_offset", "values_offset")}
+    placeholder = len(_dumps({**header, **widest}))
+    start = len(MAGIC) + HEADER_LEN.size + placeholder
+    header["index_offset"] = start
+    header["keys_offset"] = start + len(index)
+    header["values_offset"] = start + len(index) + len(keys)
+    header_bytes = _dumps(header).ljust(placeholder)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_suffix(output.suffix + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(MAGIC)
+        fh.write(HEADER_LEN.pack(len(header_bytes)))
+        fh.write(header_bytes)
+        fh.write(index)
+        fh.write(keys)
+        fh.write(values)
+    tmp.replace(output)
+    return output
+
+
+class CVBundle:
+    """Read-only view over a bundle file, backed by mmap."""
+
+    def __init__(self, path, expected_version=None):
+        self.path = Path(path)
+        self._fh = open(self.path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path}: not a CV bundle")
+        (header_len,) = HEADER_LEN.unpack_from(self._mm, len(MAGIC))
+        start = len(MAGIC) + HEADER_LEN.size
+        self.header = json.loads(self._mm[start : start + header_len])
+
+        if self.header["format"] != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{self.path}: unsupported bundle format {self.header['format']}")
+        if expected_version is not None and self.header["cv_version"] != expected_version:
+            self.close()
+            raise ValueError(
+                f"{self.path}: bundle is cv_version {self.header['cv_version']}, "
+                f"expected {expected_version}"
+            )
+
+        self._n = self.header["n_entries"]
+        self._index = self.header["index_offset"]
+        self._keys = self.header["keys_offset"]
+        self._values = self.header["values_offset"]
+
+    @property
+    def cv_version(self):
+        return self.header["cv_version"]
+
+    @property
+    def collections(self):
+        return [c for c in self.header["collections"] if c != SPECS_COLLECTION]
+
+    def __len__(self):
+        return self._n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._fh.close()
+
+    def _record(self, i):
+        return INDEX_RECORD.unpack_from(self._mm, self._index + i * INDEX_RECORD.size)
+
+    def _key_at(self, i):
+        key_off, key_len, _, _ = self._record(i)
+        start = self._keys + key_off
+        return self._mm[start : start + key_len]
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get_raw(self, collection, term_id):
+        """Return the minified JSON bytes of a term, or None."""
+        key = _encode_key(collection, term_id)
+        i = self._lower_bound(key)
+        if i == self._n or self._key_at(i) != key:
+            return None
+        _, _, value_off, value_len = self._record(i)
+        start = self._values + value_off
+        return self._mm[start : start + value_len]
+
+    def get(self, collection, term_id):
+        raw = self.get_raw(collection, term_id)
+        return None if raw is None else json.loads(raw)
+
+    def __contains__(self, item):
+        return self.get_raw(*item) is not None
+
+    def term_ids(self, collection):
+        """Return the ids of a collection in sorted order."""
+        prefix = _encode_key(collection, "")
+        ids = []
+        i = self._lower_bound(prefix)
+        while i < self._n:
+            key = self._key_at(i)
+            if not key.startswith(prefix):
+                break
+            term_id = key[len(prefix) :].decode()
+            if term_id != CONTEXT_ID:
+                ids.append(term_id)
+            i += 1
+        return ids
+
+    def context(self, collection):
+        return self.get(collection, CONTEXT_ID)
+
+    def spec(self, name):
+        return self.get(SPECS_COLLECTION, name)
+
+
+def _resolve_bundle_path(path):
+    return Path(path) if path else default_bundle_path(load_manifest()["cv_version"])
+
+
+def cmd_build(args):
+    output = build_bundle(args.output)
+    print(f"Wrote {output}")
+
+
+def cmd_get(args):
+    with CVBundle(_resolve_bundle_path(args.bundle)) as bundle:
+        raw = bundle.get_raw(args.collection, args.term_id)
+        if raw is None:
+            print(f"error: {args.collection}/{args.term_id} not found", file=sys.stderr)
+            sys.exit(1)
+        print(raw.decode())
+
+
+def cmd_info(args):
+    with CVBundle(_resolve_bundle_path(args.bundle)) as bundle:
+        header = {k: v for k, v in bundle.header.items() if not k.endswith("_offset")}
+        print(json.dumps(header, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the compiled CV bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="Compile the repository into a bundle")
+    build_parser.add_argument("--output", help="Bundle path (default: _build/obs4ref-cv-<cv_version>.cvb)")
+
+    get_parser = sub.add_parser("get", help="Print one term from a bundle")
+    get_parser.add_argument("collection")
+    get_parser.add_argument("term_id")
+    get_parser.add_argument("--bundle", help="Bundle path (default: current cv_version)")
+
+    info_parser = sub.add_parser("info", help="Print the bundle header")
+    info_parser.add_argument("--bundle", help="Bundle path (default: current cv_version)")
+
+    args = parser.parse_args()
+
+    commands = {
+        "build": cmd_build,
+        "get": cmd_get,
+        "info": cmd_info,
+    }
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
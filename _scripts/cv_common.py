@@ -0,0 +1,103 @@
+"""
+Shared helpers for the CV tooling in _scripts.
+
+Knows the repository layout: one directory per collection holding a
+000_context.jsonld and one *.json file per term, plus the *_specs.yaml
+files and esgvoc_manifest.yaml at the root.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from instrument import count
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Generated artefacts (bundles, caches, snapshots) — never committed
+BUILD_DIR = REPO_ROOT / "_build"
+
+SKIP_DIRS = {".git", ".github", ".idea", ".venv", "_CVs", "_scripts", "_build"}
+
+CONTEXT_FILENAME = "000_context.jsonld"
+MANIFEST_FILENAME = "esgvoc_manifest.yaml"
+SPEC_FILES = (
+    "project_specs.yaml",
+    "drs_specs.yaml",
+    "attr_specs.yaml",
+    "catalog_specs.yaml",
+)
+
+
+# Terms whose valid values are a pattern rather than their own id. Values
+# are lowercased before matching.
+TERM_PATTERNS = {
+    "creationdatenb": r"v\d{8}",
+    "daily": r"\d{8}-\d{8}",
+    "hourly": r"\d{12}-\d{12}",
+    "monthly": r"\d{6}-\d{6}",
+    "date": r"\d{4}-\d{2}-\d{2}t\d{2}:\d{2}:\d{2}z",
+    "gnl_url": r"https?://\S+",
+    "freetext": r"[\s\S]+",
+}
+
+
+def iter_collection_dirs(repo_root=REPO_ROOT, require_context=True):
+    """Yield (name, path) for every collection directory, sorted by name.
+
+    With require_context=False, every directory that is not skipped counts,
+    whether or not it has a 000_context.jsonld.
+    """
+    for entry in sorted(os.scandir(repo_root), key=lambda e: e.name):
+        if not entry.is_dir() or entry.name in SKIP_DIRS or entry.name.startswith("."):
+            continue
+        if require_context and not os.path.exists(os.path.join(entry.path, CONTEXT_FILENAME)):
+            continue
+        yield entry.name, Path(entry.path)
+
+
+def iter_term_files(collection_dir):
+    """Return the term files of a collection directory, sorted by name."""
+    return sorted(
+        Path(e.path)
+        for e in os.scandir(collection_dir)
+        if e.is_file() and e.name.endswith(".json")
+    )
+
+
+def load_json(path):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    count("files_read")
+    count("bytes_parsed", len(data))
+    return json.loads(data)
+
+
+def load_term_ids(collection, repo_root=REPO_ROOT):
+    """Return the term ids of one collection, in file order."""
+    ids = []
+    for term_file in iter_term_files(Path(repo_root) / collection):
+        ids.append(load_json(term_file).get("id", term_file.stem))
+    return ids
+
+
+def load_yaml(path):
+    # Imported here so the stdlib-only checks keep running without PyYAML
+    import yaml
+
+    with open(path) as fh:
+        return yaml.safe_load(fh)
+
+
+def load_specs(repo_root=REPO_ROOT):
+    """Load every *_specs.yaml file, keyed by its stem (e.g. "drs_specs")."""
+    return {
+        Path(name).stem: load_yaml(Path(repo_root) / name)
+        for name in SPEC_FILES
+        if (Path(repo_root) / name).exists()
+    }
+
+
+def load_manifest(repo_root=REPO_ROOT):
+    return load_yaml(Path(repo_root) / MANIFEST_FILENAME)
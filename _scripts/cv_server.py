@@ -0,0 +1,263 @@
+"""
+Local query service over the collections.
+
+Loads every collection once, with a prefix trie per collection, and
+answers over HTTP on a loopback port or a Unix socket. One asyncio
+process serves any number of clients from the same warm copy, so
+pipelines stop loading and scanning the tree themselves.
+
+Endpoints (JSON responses):
+  GET  /collections                          {collection: number of terms}
+  GET  /prefix?collection=C&q=P[&limit=N]    ids of C starting with P, sorted
+  POST /lookup  {"collection": C, "ids": [...], "resolve": false}
+                                             {"members": [bool...]} and, with
+                                             resolve, {"terms": [term|null...]}
+
+Ids are matched case-insensitively, as term ids are lowercase.
+
+Usage:
+  python _scripts/cv_server.py [--host 127.0.0.1] [--port 8765]
+  python _scripts/cv_server.py --unix PATH
+
+  curl 'http://127.0.0.1:8765/prefix?collection=variable_id&q=rl'
+  curl --unix-socket PATH -d '{"collection": "region", "ids": ["global"]}' http://cv/lookup
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from cv_store import CVStore
+
+
+DEFAULT_LIMIT = 50
+MAX_BODY = 16 * 1024 * 1024
+
+
+class Trie:
+    """Character trie over the ids of one collection."""
+
+    __slots__ = ("root",)
+
+    END = ""
+
+    def __init__(self, words=()):
+        self.root = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[self.END] = word
+
+    def starting_with(self, prefix, limit=None):
+        """Words starting with prefix, in sorted order, at most limit of them."""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        words = []
+        stack = [node]
+        while stack and (limit is None or len(words) < limit):
+            node = stack.pop()
+            if self.END in node:
+                words.append(node[self.END])
+            # Reversed so the smallest child is popped first
+            stack.extend(node[c] for c in sorted(node, reverse=True) if c != self.END)
+        return words
+
+
+class CVIndex:
+    """Every term of every collection, in memory, with a trie per collection."""
+
+    def __init__(self, store=None):
+        # The index keeps every term itself, so the store needs no LRU
+        self.store = store or CVStore(maxsize=0)
+        self.terms = {}
+        self.tries = {}
+        for collection in self.store.collections:
+            terms = {}
+            for term_id in self.store.term_ids(collection):
+                term = self.store.get(collection, term_id)
+                terms[str(term.get("id", term_id)).lower()] = term
+            self.terms[collection] = terms
+            self.tries[collection] = Trie(sorted(terms))
+
+    def counts(self):
+        return {collection: len(terms) for collection, terms in self.terms.items()}
+
+    def prefix(self, collection, prefix, limit=DEFAULT_LIMIT):
+        return self.tries[collection].starting_with(prefix.lower(), limit)
+
+    def lookup(self, collection, ids, resolve=False):
+        terms = self.terms[collection]
+        found = [terms.get(str(i).lower()) for i in ids]
+        result = {"members": [term is not None for term in found]}
+        if resolve:
+            result["terms"] = found
+        return result
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def handle(index, method, target, body):
+    """Return (status, payload) for one request."""
+    url = urlsplit(target)
+    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+    if url.path == "/collections" and method == "GET":
+        return HTTPStatus.OK, index.counts()
+
+    if url.path == "/prefix" and method == "GET":
+        collection = _collection(index, query.get("collection"))
+        try:
+            limit = int(query.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "limit must be an integer")
+        return HTTPStatus.OK, {"ids": index.prefix(collection, query.get("q", ""), limit)}
+
+    if url.path == "/lookup" and method == "POST":
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "body is not JSON")
+        if not isinstance(request, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        collection = _collection(index, request.get("collection"))
+        ids = request.get("ids")
+        if not isinstance(ids, list):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "ids must be a list")
+        return HTTPStatus.OK, index.lookup(collection, ids, bool(request.get("resolve")))
+
+    if url.path in ("/collections", "/prefix", "/lookup"):
+        raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {url.path}")
+    raise RequestError(HTTPStatus.NOT_FOUND, f"no endpoint {url.path}")
+
+
+def _collection(index, name):
+    if not name:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "collection is required")
+    if not isinstance(name, str):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "collection must be a string")
+    if name not in index.terms:
+        raise RequestError(HTTPStatus.NOT_FOUND, f"unknown collection {name!r}")
+    return name
+
+
+async def _readline(reader):
+    try:
+        return await reader.readline()
+    except (asyncio.LimitOverrunError, ValueError):
+        # readline reports a line longer than the stream limit as ValueError
+        raise RequestError(HTTPStatus.BAD_REQUEST, "request line or header too long")
+
+
+async def _read_request(reader):
+    """(method, target, headers, body) of the next request, or None at end of stream."""
+    request_line = await _readline(reader)
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await _readline(reader)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "malformed Content-Length")
+    if length > MAX_BODY:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, headers, body
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def make_handler(index):
+    async def serve_client(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload = handle(index, method, target, body)
+                except RequestError as exc:
+                    keep_alive = False
+                    status, payload = exc.status, {"error": str(exc)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    raise
+                except Exception as exc:
+                    # Answer instead of dropping the connection on a bug
+                    keep_alive = False
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return serve_client
+
+
+async def serve(index, host=None, port=None, unix=None):
+    handler = make_handler(index)
+    if unix:
+        server = await asyncio.start_unix_server(handler, path=unix)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+    where = unix or ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    print(f"Serving {sum(index.counts().values())} terms of {len(index.terms)} collections on {where}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local query service over the CV collections")
+    parser.add_argument("--host", default="127.0.0.1", help="Default: %(default)s (loopback only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket instead")
+    args = parser.parse_args()
+
+    index = CVIndex()
+    try:
+        asyncio.run(serve(index, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
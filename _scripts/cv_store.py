@@ -0,0 +1,161 @@
+"""
+Lazy, cached access to the collections of the repository.
+
+Collections are discovered from the directory layout only. A collection's
+000_context.jsonld and its list of term files are read the first time it
+is used, and terms are parsed one file at a time when asked for. Terms
+are looked up by their id value: the file named after the id is tried
+first and only used if it holds that id, otherwise the collection is
+scanned once. Parsed terms live in a bounded LRU keyed by (collection,
+id), with hit / miss / eviction counters, so a tool touching three
+collections never reads the other twenty. get() hands out a copy of the
+cached term (about a microsecond for a term file, less than parsing it
+again), so callers may modify it without changing what the next caller
+sees.
+
+    store = CVStore()
+    store.get("source_id", "era-5")
+    store.cache_info()
+"""
+
+import collections
+import threading
+from pathlib import Path
+
+from cv_common import CONTEXT_FILENAME, REPO_ROOT, iter_collection_dirs, iter_term_files, load_json
+
+
+DEFAULT_MAXSIZE = 4096
+
+CacheInfo = collections.namedtuple("CacheInfo", "hits misses evictions maxsize currsize")
+
+
+class _Collection:
+    """File index of one collection, built on first access."""
+
+    __slots__ = ("path", "files", "context", "ids")
+
+    def __init__(self, path):
+        self.path = path
+        # Term files are named after their id, so the file of an id is
+        # tried first; ids maps every lowercased id to (id, file) once the
+        # collection has been scanned
+        self.files = {f.stem.lower(): f for f in iter_term_files(path)}
+        self.context = None
+        self.ids = None
+
+
+def _copy(value):
+    """Copy of a parsed JSON value; faster than copy.deepcopy."""
+    if type(value) is dict:
+        return {k: _copy(v) if type(v) in (dict, list) else v for k, v in value.items()}
+    if type(value) is list:
+        return [_copy(v) if type(v) in (dict, list) else v for v in value]
+    return value
+
+
+def _term_id(term, path):
+    return str(term.get("id", path.stem)) if isinstance(term, dict) else path.stem
+
+
+class CVStore:
+    """Collections of a repository, loaded on demand."""
+
+    def __init__(self, repo_root=REPO_ROOT, maxsize=DEFAULT_MAXSIZE):
+        self.repo_root = Path(repo_root)
+        self.maxsize = maxsize
+        self._paths = dict(iter_collection_dirs(self.repo_root))
+        self._collections = {}
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def collections(self):
+        return sorted(self._paths)
+
+    def __contains__(self, collection):
+        return collection in self._paths
+
+    def _collection(self, name):
+        collection = self._collections.get(name)
+        if collection is None:
+            if name not in self._paths:
+                raise KeyError(f"unknown collection {name!r}")
+            collection = self._collections[name] = _Collection(self._paths[name])
+        return collection
+
+    def context(self, collection):
+        """Parsed 000_context.jsonld of a collection (a copy)."""
+        entry = self._collection(collection)
+        if entry.context is None:
+            entry.context = load_json(entry.path / CONTEXT_FILENAME)
+        return _copy(entry.context)
+
+    def term_ids(self, collection):
+        """The id values of a collection's terms, sorted; reads every term file once."""
+        entry = self._collection(collection)
+        with self._lock:
+            self._scan(entry)
+        return sorted(term_id for term_id, _ in entry.ids.values())
+
+    def _scan(self, entry):
+        """Index a collection by the ids its term files hold (first file wins)."""
+        if entry.ids is not None:
+            return
+        ids = {}
+        for path in sorted(entry.files.values()):
+            term_id = _term_id(load_json(path), path)
+            ids.setdefault(term_id.lower(), (term_id, path))
+        entry.ids = ids
+
+    def _load(self, entry, term_id):
+        """Parsed term with the given lowercased id, or None."""
+        if entry.ids is None:
+            path = entry.files.get(term_id)
+            if path is not None:
+                term = load_json(path)
+                if _term_id(term, path).lower() == term_id:
+                    return term
+            self._scan(entry)
+        found = entry.ids.get(term_id)
+        return load_json(found[1]) if found else None
+
+    def get(self, collection, term_id, default=None):
+        """Copy of the term with that id (case-insensitive), or default if there is none."""
+        key = (collection, term_id.lower())
+        with self._lock:
+            term = self._cache.get(key)
+            if term is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return _copy(term)
+            self.misses += 1
+
+            term = self._load(self._collection(collection), key[1])
+            if term is None:
+                return default
+            self._cache[key] = term
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return _copy(term)
+
+    def __getitem__(self, key):
+        term = self.get(*key)
+        if term is None:
+            raise KeyError(key)
+        return term
+
+    def terms(self, collection):
+        """Yield every term of a collection, through the cache."""
+        for term_id in self.term_ids(collection):
+            yield self.get(collection, term_id)
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._cache))
+
+    def cache_clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = self.evictions = 0
@@ -0,0 +1,204 @@
+"""
+Parse dataset ids and DRS directory paths back into their facets.
+
+The directory and dataset_id specs in drs_specs.yaml share the same parts
+(activity_id ... version). The part tables are the ones compiled by
+drs_validate.py, so parts are case-sensitive unless --ignore-case is
+given and --terms supplies drs_names as there; dataset ids are additionally checked against regex_id
+from catalog_specs.yaml, and base ids (without version) are derived with
+regex_base_id. Everything is a generator, so a find/scandir stream over
+a whole archive is parsed in constant memory.
+
+Usage:
+  python _scripts/drs_parse.py [INPUT|-] [--drs dataset_id|directory] [--terms FILE]
+                                [--ignore-case] [--failures-only]
+  python _scripts/drs_parse.py --walk ARCHIVE_ROOT [--terms FILE] [--ignore-case] [--failures-only]
+"""
+
+import argparse
+import collections
+import functools
+import json
+import os
+import re
+import sys
+
+from cv_common import REPO_ROOT, load_json, load_yaml
+from drs_validate import DrsValidator, read_names
+
+
+CACHE_SIZE = 65_536
+
+
+class Parsed(collections.namedtuple("Parsed", "source facets part value reason")):
+    """Outcome of parsing one string: facets on success, the failing part otherwise."""
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.facets is not None
+
+
+class DrsParser:
+    """Reverse lookup from a dataset id or directory path to typed facets."""
+
+    def __init__(
+        self,
+        drs_type="dataset_id",
+        drs_specs=None,
+        catalog_specs=None,
+        repo_root=REPO_ROOT,
+        terms=None,
+        ignore_case=False,
+    ):
+        if drs_specs is None:
+            drs_specs = load_yaml(repo_root / "drs_specs.yaml")
+        if catalog_specs is None:
+            catalog_specs = load_yaml(repo_root / "catalog_specs.yaml")
+
+        validator = DrsValidator(drs_type, drs_specs, repo_root, terms, ignore_case)
+        self.drs_type = drs_type
+        self.separator = validator.separator
+        self.parts = validator.parts
+        if validator.min_parts != validator.max_parts:
+            raise ValueError(f"{drs_type}: optional parts are not supported by the parser")
+
+        # Facet record type, one field per part, shared by directory and dataset_id
+        self.Facets = collections.namedtuple("Facets", [p.collection for p in self.parts])
+
+        properties = catalog_specs["catalog_properties"]
+        self.regex_id = re.compile(properties["regex_id"])
+        self.regex_base_id = re.compile(properties["regex_base_id"])
+
+        self._parse_values = functools.lru_cache(maxsize=CACHE_SIZE)(self._parse_values_uncached)
+
+    def _parse_values_uncached(self, values):
+        """Return (facets, failing part, failing value, reason)."""
+        if len(values) != len(self.parts):
+            return None, None, None, f"expected {len(self.parts)} parts, got {len(values)}"
+        for part, value in zip(self.parts, values):
+            if not part.match(value):
+                return None, part.collection, value, "unknown term"
+        return self.Facets._make(values), None, None, None
+
+    def _result(self, source, values):
+        return Parsed(source, *self._parse_values(values))
+
+    def parse_dataset_id(self, dataset_id):
+        if self.regex_id.fullmatch(dataset_id) is None:
+            return Parsed(dataset_id, None, None, None, "does not match catalog regex_id")
+        return self._result(dataset_id, tuple(dataset_id.split(".")))
+
+    def parse_path(self, path):
+        """Parse a directory path; a leading archive root and a trailing file name are ignored.
+
+        The DRS part of the path is anchored on the first component that is
+        a valid activity_id.
+        """
+        components = [c for c in path.split(self.separator) if c and c != "."]
+        first = self.parts[0]
+        for start, component in enumerate(components):
+            if first.match(component):
+                break
+        else:
+            return Parsed(path, None, first.collection, None, f"no {first.collection} component")
+
+        values = tuple(components[start : start + len(self.parts)])
+        if len(components) - start > len(self.parts) + 1:
+            return Parsed(path, None, None, None, "unexpected components after version")
+        return self._result(path, values)
+
+    def parse(self, value):
+        if self.drs_type == "dataset_id":
+            return self.parse_dataset_id(value)
+        return self.parse_path(value)
+
+    def parse_many(self, values, failures_only=False):
+        """Yield a Parsed for every input string (only failures if failures_only)."""
+        parse = self.parse
+        for value in values:
+            result = parse(value)
+            if result.ok and failures_only:
+                continue
+            yield result
+
+    def walk(self, root):
+        """Yield a Parsed per version directory under an archive root.
+
+        Directories whose name is not a valid term are reported and not
+        descended into. Only one scandir iterator per DRS level is open at
+        a time.
+        """
+        yield from self._walk(root, 0, ())
+
+    def _walk(self, path, depth, values):
+        part = self.parts[depth]
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                if not part.match(entry.name):
+                    yield Parsed(entry.path, None, part.collection, entry.name, "unknown term")
+                elif depth + 1 == len(self.parts):
+                    yield Parsed(entry.path, self.Facets(*values, entry.name), None, None, None)
+                else:
+                    yield from self._walk(entry.path, depth + 1, values + (entry.name,))
+
+    def dataset_id(self, facets):
+        return ".".join(facets)
+
+    def base_id(self, facets):
+        """Dataset id without its version, as matched by regex_base_id."""
+        base_id = ".".join(facets[:-1])
+        if self.regex_base_id.fullmatch(base_id) is None:
+            return None
+        return base_id
+
+
+def format_result(parser, result):
+    record = {"source": result.source, "ok": result.ok}
+    if result.ok:
+        record["facets"] = result.facets._asdict()
+        record["dataset_id"] = parser.dataset_id(result.facets)
+        record["base_id"] = parser.base_id(result.facets)
+    else:
+        record.update(part=result.part, value=result.value, reason=result.reason)
+    return json.dumps(record)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse dataset ids or DRS paths into facets")
+    parser.add_argument("input", nargs="?", default="-", help="File of ids/paths, one per line (default: stdin)")
+    parser.add_argument("--drs", default="dataset_id", choices=["dataset_id", "directory"])
+    parser.add_argument("--walk", metavar="ROOT", help="Walk an archive tree instead of reading input")
+    parser.add_argument("--terms", help="JSON {collection: {id: {drs_name, ...}}} with universe attributes")
+    parser.add_argument("--ignore-case", action="store_true", help="Compare parts case-insensitively")
+    parser.add_argument("--failures-only", action="store_true", help="Only report unparseable entries")
+    args = parser.parse_args()
+
+    terms = load_json(args.terms) if args.terms else None
+    if args.walk:
+        drs_parser = DrsParser("directory", terms=terms, ignore_case=args.ignore_case)
+        results = (r for r in drs_parser.walk(args.walk) if not (args.failures_only and r.ok))
+        fh = None
+    else:
+        drs_parser = DrsParser(args.drs, terms=terms, ignore_case=args.ignore_case)
+        fh = sys.stdin if args.input == "-" else open(args.input)
+        results = drs_parser.parse_many(read_names(fh), args.failures_only)
+
+    failed = 0
+    for result in results:
+        if not result.ok:
+            failed += 1
+        sys.stdout.write(format_result(drs_parser, result) + "\n")
+
+    if fh is not None and fh is not sys.stdin:
+        fh.close()
+    if failed:
+        print(f"{failed} entr{'y' if failed == 1 else 'ies'} failed to parse", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Batch validator for names built from the DRS specs in drs_specs.yaml.
+
+The spec and the allowed values of every part are compiled once into
+per-part hash sets, plus one regex per part for pattern terms such as
+time_range/monthly or version/creationdatenb. Checking a name is then a
+split and a handful of set lookups. Validated heads (the required parts)
+and optional trailing values are memoised, so the common case of many
+files per dataset costs a partition and two set lookups. On one core
+this runs at about 200k distinct file names/s (see benchmark.py); names
+sharing their dataset head are faster, and --jobs scales it out.
+
+Parts must match the drs_name of a term exactly (TS is not the variable
+ts). Term ids are lowercased drs_names, so the case comes from (see
+load_drs_names) universe attributes given with --terms, a drs_name in
+the term file, a key of the collection's _CVs aggregate that differs
+from the id only in case, or the project drs_name for the activity;
+otherwise the id itself is the drs_name. --ignore-case compares parts
+case-insensitively instead.
+
+Usage:
+  python _scripts/drs_validate.py [NAMES_FILE|-] [--drs file_name] [--terms FILE]
+                                  [--ignore-case] [--jobs N] [--failures-only]
+                                  [--format tsv|jsonl]
+"""
+
+import argparse
+import collections
+import functools
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+from pathlib import Path
+
+from cv_common import REPO_ROOT, TERM_PATTERNS, iter_term_files, load_json, load_yaml
+
+
+DEFAULT_CHUNK_SIZE = 50_000
+CACHE_LIMIT = 1_000_000
+RANGE_BYTES = 4 * 1024 * 1024
+
+Verdict = collections.namedtuple("Verdict", "name ok part value reason")
+
+
+def _aggregate_keys(collection, repo_root):
+    """Member names of _CVs/obs4MIPs_<collection>.json, looking through version_metadata layouts."""
+    path = Path(repo_root) / "_CVs" / f"obs4MIPs_{collection}.json"
+    if not path.exists():
+        return []
+    content = load_json(path).get(collection)
+    if isinstance(content, dict) and collection in content:
+        content = content[collection]
+    return list(content) if isinstance(content, (dict, list)) else []
+
+
+def load_drs_names(collection, repo_root=REPO_ROOT, terms=None):
+    """{term id: drs_name} of a collection, in file order.
+
+    terms is {collection: {id: {drs_name: ...}}} of universe attributes.
+    """
+    cased = {key.lower(): key for key in _aggregate_keys(collection, repo_root) if isinstance(key, str)}
+    if collection == "activity_id":
+        project = load_yaml(Path(repo_root) / "project_specs.yaml")
+        cased[project["project_id"]] = project["drs_name"]
+    universe = (terms or {}).get(collection) or {}
+
+    names = {}
+    for term_file in iter_term_files(Path(repo_root) / collection):
+        term = load_json(term_file)
+        term_id = term.get("id", term_file.stem)
+        drs_name = (universe.get(term_id) or {}).get("drs_name") or term.get("drs_name")
+        names[term_id] = drs_name or cased.get(term_id, term_id)
+    return names
+
+
+class PartTable:
+    """Allowed values of one DRS part, precompiled for lookups."""
+
+    __slots__ = ("collection", "is_required", "values", "pattern", "fold")
+
+    def __init__(self, collection, is_required, drs_names, fold=False):
+        self.collection = collection
+        self.is_required = is_required
+        self.fold = fold
+        self.values = frozenset(
+            name.lower() if fold else name for term_id, name in drs_names.items() if term_id not in TERM_PATTERNS
+        )
+        patterns = [TERM_PATTERNS[t] for t in drs_names if t in TERM_PATTERNS]
+        self.pattern = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+
+    def match(self, value):
+        if self.fold:
+            value = value.lower()
+        return value in self.values or (
+            self.pattern is not None and self.pattern.fullmatch(value) is not None
+        )
+
+
+class DrsValidator:
+    """Compiled matcher for one DRS type (file_name, directory or dataset_id)."""
+
+    def __init__(self, drs_type="file_name", drs_specs=None, repo_root=REPO_ROOT, terms=None, ignore_case=False):
+        if drs_specs is None:
+            drs_specs = load_yaml(repo_root / "drs_specs.yaml")
+        spec = drs_specs[drs_type]
+
+        self.drs_type = drs_type
+        self.fold = ignore_case
+        self.separator = spec["separator"]
+        properties = spec.get("properties") or {}
+        if "extension" in properties:
+            self.suffix = properties.get("extension_separator", ".") + properties["extension"]
+        else:
+            self.suffix = ""
+
+        drs_names = {}
+        self.parts = []
+        for part in spec["parts"]:
+            collection = part["source_collection"]
+            if collection not in drs_names:
+                drs_names[collection] = load_drs_names(collection, repo_root, terms)
+            self.parts.append(PartTable(collection, part["is_required"], drs_names[collection], ignore_case))
+
+        # Optional parts are only supported at the end, as in the spec
+        required = [i for i, p in enumerate(self.parts) if p.is_required]
+        self.min_parts = required[-1] + 1 if required else 0
+        self.max_parts = len(self.parts)
+        if len(required) != self.min_parts:
+            raise ValueError(f"{drs_type}: optional parts must come last")
+
+        # Memo of already validated required parts (as they appeared in the
+        # input) and, when there is a single optional part, of its values
+        self._valid_heads = set()
+        self._valid_tails = set() if self.max_parts == self.min_parts + 1 else None
+
+    def failure(self, name):
+        """Return a failing Verdict for name, or None if it is valid."""
+        stem = name
+        if self.suffix:
+            if not name.endswith(self.suffix):
+                return Verdict(name, False, "extension", None, f"expected '{self.suffix}' suffix")
+            stem = name[: -len(self.suffix)]
+
+        # Files of one dataset share everything but the optional last part
+        if stem in self._valid_heads:
+            return None
+        if self._valid_tails is not None:
+            head, _, tail = stem.rpartition(self.separator)
+            if head in self._valid_heads and tail in self._valid_tails:
+                return None
+
+        return self._check_parts(name, stem)
+
+    def _check_parts(self, name, stem):
+        values = (stem.lower() if self.fold else stem).split(self.separator)
+        n = len(values)
+        if n < self.min_parts or n > self.max_parts:
+            return Verdict(
+                name, False, None, None,
+                f"expected {self.min_parts}-{self.max_parts} parts, got {n}",
+            )
+
+        for i, (part, value) in enumerate(zip(self.parts, values)):
+            if value in part.values:
+                continue
+            if part.pattern is not None and part.pattern.fullmatch(value) is not None:
+                continue
+            original = stem.split(self.separator)[i]
+            return Verdict(name, False, part.collection, original, "unknown term")
+
+        if len(self._valid_heads) >= CACHE_LIMIT:
+            self._valid_heads.clear()
+            if self._valid_tails is not None:
+                self._valid_tails.clear()
+        if n == self.min_parts:
+            self._valid_heads.add(stem)
+        elif self._valid_tails is not None:
+            head, _, tail = stem.rpartition(self.separator)
+            self._valid_heads.add(head)
+            self._valid_tails.add(tail)
+        return None
+
+    def check(self, name):
+        return self.failure(name) or Verdict(name, True, None, None, None)
+
+    def validate(self, names, failures_only=False):
+        """Yield a Verdict per name (only the failures if failures_only)."""
+        failure = self.failure
+        if failures_only:
+            for name in names:
+                verdict = failure(name)
+                if verdict is not None:
+                    yield verdict
+        else:
+            for name in names:
+                yield failure(name) or Verdict(name, True, None, None, None)
+
+
+_worker_validator = None
+
+
+def _init_worker(validator):
+    global _worker_validator
+    _worker_validator = validator
+
+
+def _validate_chunk(names, failures_only):
+    return list(_worker_validator.validate(names, failures_only))
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+def validate_parallel(validator, names, jobs, failures_only=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Like DrsValidator.validate, fanned out over a process pool, in input order."""
+    work = functools.partial(_validate_chunk, failures_only=failures_only)
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(validator,)) as pool:
+        for verdicts in pool.imap(work, _chunks(names, chunk_size)):
+            yield from verdicts
+
+
+def _validate_range(bounds, path, failures_only):
+    start, end = bounds
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        names = fh.read(end - start).decode().splitlines()
+    return list(_worker_validator.validate(filter(None, names), failures_only))
+
+
+def _file_ranges(path, size_hint):
+    """Split a file into byte ranges of about size_hint that end on newlines."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as fh:
+        while bounds[-1] < size:
+            fh.seek(bounds[-1] + size_hint)
+            fh.readline()
+            bounds.append(min(fh.tell(), size))
+    return list(zip(bounds, bounds[1:]))
+
+
+def validate_file_parallel(validator, path, jobs, failures_only=False, range_bytes=RANGE_BYTES):
+    """Validate a newline file with workers reading their own byte ranges.
+
+    Only the verdicts cross process boundaries, not the names themselves.
+    """
+    work = functools.partial(_validate_range, path=path, failures_only=failures_only)
+    ranges = _file_ranges(path, range_bytes)
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(validator,)) as pool:
+        for verdicts in pool.imap(work, ranges):
+            yield from verdicts
+
+
+def read_names(fh):
+    """Yield the non-empty lines of a newline separated file of names."""
+    for line in fh:
+        name = line.rstrip("\r\n")
+        if name:
+            yield name
+
+
+def format_verdict(verdict, fmt):
+    if fmt == "jsonl":
+        return json.dumps(verdict._asdict())
+    if verdict.ok:
+        return f"{verdict.name}\tOK"
+    return f"{verdict.name}\tFAIL\t{verdict.part or ''}\t{verdict.value or ''}\t{verdict.reason}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate names against a DRS spec")
+    parser.add_argument("names", nargs="?", default="-", help="File of names, one per line (default: stdin)")
+    parser.add_argument("--drs", default="file_name", choices=["file_name", "directory", "dataset_id"])
+    parser.add_argument("--terms", help="JSON {collection: {id: {drs_name, ...}}} with universe attributes")
+    parser.add_argument("--ignore-case", action="store_true", help="Compare parts case-insensitively")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+        help="Names per task when fanning out stdin (default: %(default)s)",
+    )
+    parser.add_argument("--failures-only", action="store_true", help="Only report invalid names")
+    parser.add_argument("--format", default="tsv", choices=["tsv", "jsonl"])
+    args = parser.parse_args()
+
+    terms = load_json(args.terms) if args.terms else None
+    validator = DrsValidator(args.drs, terms=terms, ignore_case=args.ignore_case)
+    fh = sys.stdin if args.names == "-" else open(args.names)
+
+    if args.jobs > 1 and fh is not sys.stdin:
+        verdicts = validate_file_parallel(validator, args.names, args.jobs, args.failures_only)
+    elif args.jobs > 1:
+        verdicts = validate_parallel(
+            validator, read_names(fh), args.jobs, args.failures_only, args.chunk_size
+        )
+    else:
+        verdicts = validator.validate(read_names(fh), args.failures_only)
+
+    failed = 0
+    out = sys.stdout
+    for verdict in verdicts:
+        if not verdict.ok:
+            failed += 1
+        out.write(format_verdict(verdict, args.format) + "\n")
+
+    if fh is not sys.stdin:
+        fh.close()
+    if failed:
+        print(f"{failed} invalid name(s)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
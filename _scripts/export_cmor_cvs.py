@@ -0,0 +1,263 @@
+"""
+Regenerate the CMOR-style _CVs/obs4MIPs_*.json aggregates from the
+collection directories.
+
+Membership comes from the term files: a term is in the aggregate if and
+only if its collection directory has a file for it. The term files only
+hold ids, so the CMOR key (original case, e.g. 1hrCM or "0.5 km") and
+value (description, or the source_id record) are taken from --terms when
+given, then from the current aggregate. An aggregate with terms found in
+neither is not written (CMOR tools would load the placeholders); with
+--skip-missing those terms are left out of it instead. Files are written
+in the format of the committed ones: four-space indent and, unless the
+file on disk already has one, no trailing newline.
+
+Each aggregate is written in one pass with deterministic key order, and
+only when its content changes. The content hash of the inputs (term
+files, --terms entries, output options) of the last export is kept in
+_build, so unchanged aggregates are not even rebuilt. --check ignores
+those hashes: it rebuilds every aggregate and compares it with the file
+on disk, so it gives the same answer on a fresh checkout. Terms without
+CMOR attributes cannot be exported by anyone, so --check compares
+without them and only warns; it fails on aggregates that differ.
+
+Aggregates without a per-term collection (license, table_id,
+required_global_attributes) are not touched.
+
+Usage:
+  python _scripts/export_cmor_cvs.py [NAME...] [--terms FILE] [--minify]
+                                     [--output-dir DIR] [--force] [--check]
+                                     [--skip-missing]
+"""
+
+import argparse
+import collections
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from cv_common import BUILD_DIR, REPO_ROOT, iter_term_files, load_json
+
+
+# Bump when the output layout changes, so every aggregate is rewritten
+EXPORT_VERSION = 1
+
+HASHES_PATH = BUILD_DIR / "cmor_export_hashes.json"
+
+Aggregate = collections.namedtuple("Aggregate", "collection members nested")
+
+# members: "list" of keys, or "mapping" of key -> value
+# nested: {name: {name: members, version_metadata: ...}} instead of {name: members}
+AGGREGATES = {
+    "frequency": Aggregate("frequency", "mapping", True),
+    "grid_label": Aggregate("grid_label", "mapping", True),
+    "institution_id": Aggregate("institution_id", "mapping", False),
+    "nominal_resolution": Aggregate("nominal_resolution", "list", True),
+    "product": Aggregate("product", "list", False),
+    "realm": Aggregate("realm", "list", False),
+    "region": Aggregate("region", "list", False),
+    "source_id": Aggregate("source_id", "mapping", False),
+    "source_type": Aggregate("source_type", "mapping", False),
+}
+
+# Universe fields that are not part of a CMOR source_id record
+IGNORED_TERM_FIELDS = {"@context", "id", "type", "drs_name", "description"}
+
+
+def aggregate_path(output_dir, name):
+    return Path(output_dir) / f"obs4MIPs_{name}.json"
+
+
+def _normalise(key):
+    return key.lower().replace(" ", "")
+
+
+def _file_hash(path):
+    try:
+        with open(path, "rb") as fh:
+            return hashlib.sha256(fh.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def read_members(collection, repo_root=REPO_ROOT):
+    """Return (ids, digest) for a collection, reading each term file once."""
+    digest = hashlib.sha256()
+    ids = []
+    for path in iter_term_files(Path(repo_root) / collection):
+        raw = path.read_bytes()
+        digest.update(path.name.encode() + b"\0" + raw + b"\0")
+        ids.append(json.loads(raw).get("id", path.stem))
+    return ids, digest
+
+
+class CurrentAggregate:
+    """The aggregate on disk: its members keyed by normalised key, and its metadata."""
+
+    def __init__(self, path, name, spec):
+        self.members = {}
+        self.metadata = None
+        if not path.exists():
+            return
+        content = load_json(path).get(name)
+        if spec.nested and isinstance(content, dict):
+            self.metadata = content.get("version_metadata")
+            content = content.get(name)
+        if isinstance(content, dict):
+            self.members = {_normalise(k): (k, v) for k, v in content.items()}
+        elif isinstance(content, list):
+            self.members = {_normalise(k): (k, None) for k in content}
+
+
+def _from_terms(term, spec):
+    """CMOR (key, value) for a universe term, or None."""
+    key = term.get("drs_name")
+    if spec.members == "list":
+        return (key, None) if key else None
+    if spec.collection == "source_id":
+        value = {k: v for k, v in term.items() if k not in IGNORED_TERM_FIELDS}
+        return key, value
+    return key, term.get("description")
+
+
+def build_aggregate(name, ids, current, terms):
+    """Return (content, missing); the ids in missing have no CMOR attributes and are left out."""
+    spec = AGGREGATES[name]
+    members = {}
+    missing = []
+    for term_id in ids:
+        found = None
+        if term_id in terms:
+            found = _from_terms(terms[term_id], spec)
+        if (found is None or found[0] is None) and _normalise(term_id) in current.members:
+            found = current.members[_normalise(term_id)]
+        if found is None or found[0] is None:
+            missing.append(term_id)
+            continue
+        members[found[0]] = found[1]
+
+    if spec.members == "list":
+        content = sorted(members)
+    else:
+        content = {key: members[key] for key in sorted(members)}
+    if spec.nested:
+        content = {name: content}
+        if current.metadata is not None:
+            content["version_metadata"] = current.metadata
+    return {name: content}, missing
+
+
+def encode_json(content, minify, newline=False):
+    """Serialised aggregate, with sorted keys; newline adds a trailing one."""
+    if minify:
+        encoder = json.JSONEncoder(separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    else:
+        encoder = json.JSONEncoder(indent=4, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    return "".join(encoder.iterencode(content)) + ("\n" if newline else "")
+
+
+def write_text(path, text):
+    """Write through a temporary file, so readers never see a partial aggregate."""
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    tmp.replace(path)
+
+
+def _read_text(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def export(names, output_dir, terms=None, minify=False, force=False, check=False, skip_missing=False,
+           hashes_path=HASHES_PATH, repo_root=REPO_ROOT):
+    """Rebuild the given aggregates.
+
+    Returns {name: status}: "written", "unchanged", "stale" (with check) or
+    "incomplete" (terms without CMOR attributes, without skip_missing or check).
+    """
+    hashes = load_json(hashes_path) if Path(hashes_path).exists() else {}
+    status = {}
+
+    for name in names:
+        spec = AGGREGATES[name]
+        path = aggregate_path(output_dir, name)
+        collection_terms = (terms or {}).get(spec.collection, {})
+
+        ids, digest = read_members(spec.collection, repo_root)
+        digest.update(json.dumps(collection_terms, sort_keys=True).encode())
+        digest.update(f"{EXPORT_VERSION}:{int(minify)}".encode())
+        inputs = digest.hexdigest()
+
+        previous = hashes.get(name, {})
+        if (
+            not (force or check)
+            and previous.get("inputs") == inputs
+            and previous.get("output") == _file_hash(path)
+        ):
+            status[name] = "unchanged"
+            continue
+
+        content, missing = build_aggregate(name, ids, CurrentAggregate(path, name, spec), collection_terms)
+        if missing:
+            action = "left out" if skip_missing or check else "not exported"
+            print(f"warning: {name}: no CMOR attributes for {', '.join(missing)} ({action})", file=sys.stderr)
+            if not (skip_missing or check):
+                status[name] = "incomplete"
+                continue
+
+        current = _read_text(path)
+        text = encode_json(content, minify, newline=current is not None and current.endswith("\n"))
+        if text == current:
+            status[name] = "unchanged"
+        elif check:
+            status[name] = "stale"
+            continue
+        else:
+            write_text(path, text)
+            status[name] = "written"
+        if not check:
+            hashes[name] = {"inputs": inputs, "output": _file_hash(path)}
+
+    if not check:
+        Path(hashes_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(hashes_path, "w") as fh:
+            json.dump(hashes, fh, indent=2, sort_keys=True)
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the _CVs CMOR aggregates from the collections")
+    parser.add_argument("names", nargs="*", metavar="NAME", help=f"Aggregates to build (default: all of {', '.join(AGGREGATES)})")
+    parser.add_argument("--terms", help="JSON {collection: {id: {drs_name, description, ...}}} from the universe")
+    parser.add_argument("--minify", action="store_true", help="Write compact JSON")
+    parser.add_argument("--output-dir", default=str(REPO_ROOT / "_CVs"))
+    parser.add_argument("--force", action="store_true", help="Rewrite even if the inputs are unchanged")
+    parser.add_argument("--check", action="store_true", help="Only report stale aggregates; exit 1 if any")
+    parser.add_argument(
+        "--skip-missing", action="store_true", help="Leave out terms without CMOR attributes instead of failing"
+    )
+    args = parser.parse_args()
+
+    names = args.names or list(AGGREGATES)
+    unknown = set(names) - set(AGGREGATES)
+    if unknown:
+        print(f"error: unknown aggregate(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        sys.exit(1)
+
+    terms = load_json(args.terms) if args.terms else None
+    status = export(names, args.output_dir, terms, args.minify, args.force, args.check, args.skip_missing)
+    for name in names:
+        print(f"{name}: {status[name]}")
+
+    if "incomplete" in status.values() or (args.check and "stale" in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
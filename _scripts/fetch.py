@@ -0,0 +1,152 @@
+"""
+Shared HTTP layer for the _scripts generators.
+
+All upstream JSON goes through one pooled requests.Session. Responses
+are kept in an on-disk cache together with their ETag/Last-Modified, so
+a refetch is a conditional request and unchanged documents are not
+downloaded again. Several URLs can be fetched concurrently with a bounded
+thread pool.
+
+Environment:
+  OBS4REF_OFFLINE=1        Never touch the network; replay from the cache
+  OBS4REF_UPSTREAM_DIR=D   Serve URLs from D/<host>/<path> instead of the
+                           network (e.g. a fixture copy of the CMOR tables)
+  OBS4REF_HTTP_CACHE=D     Cache directory (default: _build/http_cache)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from cv_common import BUILD_DIR
+from instrument import count, span
+
+
+MAX_WORKERS = 8
+TIMEOUT = 30
+
+_config = {
+    "offline": os.environ.get("OBS4REF_OFFLINE", "") not in ("", "0"),
+    "upstream_dir": os.environ.get("OBS4REF_UPSTREAM_DIR") or None,
+    "cache_dir": os.environ.get("OBS4REF_HTTP_CACHE") or str(BUILD_DIR / "http_cache"),
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure(offline=None, upstream_dir=None, cache_dir=None):
+    """Override the environment defaults for this process."""
+    if offline is not None:
+        _config["offline"] = offline
+    if upstream_dir is not None:
+        _config["upstream_dir"] = str(upstream_dir)
+    if cache_dir is not None:
+        _config["cache_dir"] = str(cache_dir)
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Imported here: cached, offline and fixture runs never need requests
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _cache_paths(url):
+    key = hashlib.sha256(url.encode()).hexdigest()
+    cache_dir = Path(_config["cache_dir"])
+    return cache_dir / f"{key}.body", cache_dir / f"{key}.meta.json"
+
+
+def _read_cache(url):
+    body_path, meta_path = _cache_paths(url)
+    if not body_path.exists() or not meta_path.exists():
+        return None, None
+    with open(meta_path) as fh:
+        meta = json.load(fh)
+    return body_path.read_bytes(), meta
+
+
+def _write_cache(url, body, meta):
+    body_path, meta_path = _cache_paths(url)
+    body_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so concurrent fetches never see a partial file
+    for path, data in ((body_path, body), (meta_path, json.dumps(meta).encode())):
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+
+def _read_upstream_dir(url):
+    parts = urlsplit(url)
+    path = Path(_config["upstream_dir"]) / parts.netloc / parts.path.lstrip("/")
+    if not path.exists():
+        raise FileNotFoundError(f"{url}: no stand-in at {path}")
+    return path.read_bytes()
+
+
+def fetch_bytes(url):
+    """Return the body of url, using the cache and the offline settings."""
+    with span("fetch", url=url):
+        body = _fetch_bytes(url)
+    count("bytes_fetched", len(body))
+    return body
+
+
+def _fetch_bytes(url):
+    if _config["upstream_dir"]:
+        return _read_upstream_dir(url)
+
+    body, meta = _read_cache(url)
+    if _config["offline"]:
+        if body is None:
+            raise FileNotFoundError(f"{url}: not in cache and running offline")
+        return body
+
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = get_session().get(url, headers=headers, timeout=TIMEOUT)
+    count("http.requests")
+    if response.status_code == 304 and body is not None:
+        count("http.not_modified")
+        return body
+    response.raise_for_status()  # Check for request errors
+
+    _write_cache(
+        url,
+        response.content,
+        {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        },
+    )
+    return response.content
+
+
+def fetch_json(url):
+    return json.loads(fetch_bytes(url))
+
+
+def fetch_json_many(urls, max_workers=MAX_WORKERS):
+    """Fetch several URLs concurrently; results are in the order of urls."""
+    urls = list(urls)
+    with ThreadPoolExecutor(max_workers=min(max_workers, max(len(urls), 1))) as pool:
+        return list(pool.map(fetch_json, urls))
@@ -0,0 +1,261 @@
+"""
+Timing spans and counters for the CV tooling.
+
+Code marks its phases with spans and bumps named counters:
+
+    from instrument import count, span
+
+    with span("parse", collection=name):
+        ...
+    count("files_read")
+
+Both are no-ops unless tracing is on: span() then hands back one shared
+null context manager and count() returns at once, so instrumented hot
+paths cost a global lookup and a call. Tracing is switched on from the
+environment, so any run can be profiled without code changes:
+
+  OBS4REF_TRACE=F           Record spans and counters, written to F at exit
+                            (- prints a per-span summary to stderr instead)
+  OBS4REF_TRACE_FORMAT=X    json (default) or chrome, the trace-event format
+                            read by chrome://tracing and Perfetto
+  OBS4REF_PROFILE=F         Also run cProfile and dump its stats to F
+
+Only the main process records: worker processes (multiprocessing pools,
+forked or spawned) inherit the environment but would overwrite F with
+their own trace, so tracing is off in them and their time shows up in
+the span around the pool in the parent.
+
+Only the standard library is used, so the CI helpers can load it too.
+
+Usage:
+  python _scripts/instrument.py summary TRACE
+"""
+
+import argparse
+import atexit
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+
+TRACE_FORMATS = ("json", "chrome")
+
+Span = collections.namedtuple("Span", "name start duration thread args")
+
+_recorder = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("recorder", "name", "args", "start")
+
+    def __init__(self, recorder, name, args):
+        self.recorder = recorder
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.recorder.spans.append(
+            Span(self.name, self.start - self.recorder.epoch, end - self.start, threading.get_ident(), self.args)
+        )
+        return False
+
+
+class Recorder:
+    """Spans (in ns since the recorder started) and counter totals of one process."""
+
+    def __init__(self):
+        self.epoch = time.perf_counter_ns()
+        self.spans = []
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+
+    def count(self, name, n):
+        with self._lock:
+            self.counters[name] += n
+
+    def totals(self):
+        """{span name: (calls, total ns)}"""
+        totals = {}
+        for s in self.spans:
+            calls, total = totals.get(s.name, (0, 0))
+            totals[s.name] = (calls + 1, total + s.duration)
+        return totals
+
+    def to_json(self):
+        return {
+            "spans": [
+                {"name": s.name, "start_us": s.start / 1000, "duration_us": s.duration / 1000, "thread": s.thread,
+                 "args": s.args}
+                for s in self.spans
+            ],
+            "counters": dict(self.counters),
+        }
+
+    def to_chrome(self):
+        pid = os.getpid()
+        events = [
+            {"name": s.name, "ph": "X", "ts": s.start / 1000, "dur": s.duration / 1000, "pid": pid, "tid": s.thread,
+             "args": s.args}
+            for s in self.spans
+        ]
+        end = (time.perf_counter_ns() - self.epoch) / 1000
+        events.extend(
+            {"name": name, "ph": "C", "ts": end, "pid": pid, "args": {name: value}}
+            for name, value in sorted(self.counters.items())
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def span(name, **args):
+    """Context manager timing one phase; free when tracing is off."""
+    if _recorder is None:
+        return _NULL_SPAN
+    return _ActiveSpan(_recorder, name, args)
+
+
+def count(name, n=1):
+    """Add n to a named counter when tracing is on."""
+    if _recorder is not None:
+        _recorder.count(name, n)
+
+
+def timed(name=None):
+    """Decorator: run the function inside a span (named after it by default)."""
+
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with _ActiveSpan(_recorder, label, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def enabled():
+    return _recorder is not None
+
+
+def format_summary(totals, counters):
+    lines = [f"{'span':<32} {'calls':>8} {'total ms':>12}"]
+    for name, (calls, total) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<32} {calls:>8} {total / 1e6:>12.3f}")
+    for name, value in sorted(counters.items()):
+        lines.append(f"{name:<32} {value:>8}")
+    return "\n".join(lines)
+
+
+def write_trace(recorder, path, fmt="json"):
+    if path == "-":
+        print(format_summary(recorder.totals(), recorder.counters), file=sys.stderr)
+        return
+    document = recorder.to_chrome() if fmt == "chrome" else recorder.to_json()
+    with open(path, "w") as fh:
+        json.dump(document, fh)
+
+
+def enable(trace=None, fmt="json", profile=None):
+    """Start recording; the trace and profile are written when the process exits."""
+    global _recorder
+    if fmt not in TRACE_FORMATS:
+        raise ValueError(f"unknown trace format {fmt!r}")
+    _recorder = recorder = Recorder()
+    if trace:
+        atexit.register(write_trace, recorder, trace, fmt)
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        atexit.register(lambda: (profiler.disable(), profiler.dump_stats(profile)))
+    return recorder
+
+
+def _disable_in_child():
+    # A forked child inherits the recorder; its atexit handlers never run
+    global _recorder
+    _recorder = None
+
+
+def _enable_from_environment():
+    trace = os.environ.get("OBS4REF_TRACE")
+    profile = os.environ.get("OBS4REF_PROFILE")
+    if not (trace or profile):
+        return
+    import multiprocessing
+
+    # Spawned workers import this module afresh, after being given their
+    # name but before parent_process() is set
+    if multiprocessing.current_process().name == "MainProcess":
+        enable(trace, os.environ.get("OBS4REF_TRACE_FORMAT", "json"), profile)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_disable_in_child)
+_enable_from_environment()
+
+
+def load_trace(path):
+    """(totals, counters) of a json or chrome trace file."""
+    with open(path) as fh:
+        document = json.load(fh)
+    totals, counters = {}, {}
+    if "traceEvents" in document:
+        for event in document["traceEvents"]:
+            if event["ph"] == "X":
+                calls, total = totals.get(event["name"], (0, 0))
+                totals[event["name"]] = (calls + 1, total + event["dur"] * 1000)
+            elif event["ph"] == "C":
+                counters.update(event["args"])
+    else:
+        for s in document["spans"]:
+            calls, total = totals.get(s["name"], (0, 0))
+            totals[s["name"]] = (calls + 1, total + s["duration_us"] * 1000)
+        counters = document["counters"]
+    return totals, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect traces written with OBS4REF_TRACE")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary_parser = sub.add_parser("summary", help="Time per span and counter totals of a trace")
+    summary_parser.add_argument("trace")
+    args = parser.parse_args()
+
+    try:
+        totals, counters = load_trace(args.trace)
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"error: {args.trace}: {exc}", file=sys.stderr)
+        sys.exit(1)
+    print(format_summary(totals, counters))
+
+
+if __name__ == "__main__":
+    main()
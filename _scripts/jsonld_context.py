@@ -0,0 +1,223 @@
+"""
+Compiled JSON-LD contexts and an expanded dump of the collections.
+
+Every term file points at its collection's 000_context.jsonld. Each
+context is compiled once into a flat map: @base, @vocab, the keywords
+aliased by id/type, the IRI and coercion of every field, and the terms
+usable as compact IRI prefixes. Expanding a term is then a few dict
+lookups per field, with no JSON-LD processor involved.
+
+The dump holds every term of the selected collections as N-Triples or
+expanded JSON-LD, for graph consumers.
+
+Usage:
+  python _scripts/jsonld_context.py [COLLECTION...] [--format nt|jsonld] [--output FILE|-]
+"""
+
+import argparse
+import collections
+import json
+import sys
+from pathlib import Path
+from urllib.parse import urljoin
+
+from cv_common import BUILD_DIR, CONTEXT_FILENAME
+from cv_store import CVStore
+
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDF_JSON = "http://www.w3.org/1999/02/22-rdf-syntax-ns#JSON"
+
+Field = collections.namedtuple("Field", "iri coerce")
+
+Expanded = collections.namedtuple("Expanded", "id types properties")
+
+
+class CompiledContext:
+    """Flat form of one @context object."""
+
+    def __init__(self, context):
+        context = context.get("@context", context)
+        self.base = context.get("@base")
+        self.vocab = context.get("@vocab")
+        self.aliases = {}
+        self.fields = {}
+        self.prefixes = {}
+
+        for key, definition in context.items():
+            if key.startswith("@"):
+                continue
+            if isinstance(definition, str) and definition.startswith("@"):
+                self.aliases[key] = definition
+                continue
+            if isinstance(definition, dict):
+                iri, coerce = definition.get("@id"), definition.get("@type")
+            else:
+                iri, coerce = definition, None
+            if iri is None:
+                continue
+            self.fields[key] = Field(iri, coerce)
+            if isinstance(iri, str) and iri.endswith(("/", "#")):
+                self.prefixes[key] = iri
+
+        # Second pass: field IRIs may themselves be compact or vocab-relative
+        self.fields = {
+            key: Field(self.expand_iri(field.iri, vocab=True, terms=False), field.coerce)
+            for key, field in self.fields.items()
+        }
+        self.id_keys = {k for k, v in self.aliases.items() if v == "@id"} | {"@id"}
+        self.type_keys = {k for k, v in self.aliases.items() if v == "@type"} | {"@type"}
+
+    def expand_iri(self, value, vocab=False, terms=True):
+        """IRI expansion: terms and @vocab for vocab-relative values, @base otherwise."""
+        if terms and vocab and value in self.fields:
+            return self.fields[value].iri
+        prefix, sep, suffix = value.partition(":")
+        if sep and not suffix.startswith("//") and prefix in self.prefixes:
+            return self.prefixes[prefix] + suffix
+        if sep and (suffix.startswith("//") or prefix not in self.fields):
+            return value
+        if vocab and self.vocab is not None:
+            return self.vocab + value
+        if self.base is not None:
+            return urljoin(self.base, value)
+        return None
+
+    def expand(self, term):
+        """Expand one term document into an Expanded node."""
+        node_id = None
+        types = []
+        properties = {}
+        for key, value in term.items():
+            if key == "@context":
+                continue
+            if key in self.id_keys:
+                node_id = self.expand_iri(str(value))
+            elif key in self.type_keys:
+                for t in value if isinstance(value, list) else [value]:
+                    iri = self.expand_iri(t, vocab=True)
+                    if iri is not None:
+                        types.append(iri)
+            else:
+                predicate = self.fields[key].iri if key in self.fields else self.expand_iri(key, vocab=True, terms=False)
+                if predicate is None:
+                    # Keys the context does not map are dropped, as in JSON-LD
+                    continue
+                coerce = self.fields[key].coerce if key in self.fields else None
+                values = value if isinstance(value, list) else [value]
+                properties[predicate] = [self._object(v, coerce) for v in values if v is not None]
+        return Expanded(node_id, types, properties)
+
+    def _object(self, value, coerce):
+        if coerce in ("@id", "@vocab") and isinstance(value, str):
+            return {"@id": self.expand_iri(value, vocab=coerce == "@vocab")}
+        if isinstance(value, bool):
+            return {"@value": value}
+        if isinstance(value, (int, float)):
+            return {"@value": value}
+        if isinstance(value, str):
+            return {"@value": value, "@type": self.expand_iri(coerce, vocab=True)} if coerce else {"@value": value}
+        return {"@value": value, "@type": "@json"}
+
+
+class ContextCache:
+    """One CompiledContext per collection, compiled on first use."""
+
+    def __init__(self, store=None):
+        self.store = store or CVStore()
+        self._compiled = {}
+
+    def compiled(self, collection):
+        context = self._compiled.get(collection)
+        if context is None:
+            context = self._compiled[collection] = CompiledContext(self.store.context(collection))
+        return context
+
+    def expand_term(self, collection, term):
+        if term.get("@context", CONTEXT_FILENAME) != CONTEXT_FILENAME:
+            raise ValueError(f"{collection}/{term.get('id')}: unsupported @context {term['@context']!r}")
+        return self.compiled(collection).expand(term)
+
+    def expand_collection(self, collection):
+        """Yield an Expanded node per term of a collection."""
+        for term in self.store.terms(collection):
+            yield self.expand_term(collection, term)
+
+
+def _nt_literal(value):
+    if isinstance(value, dict) and "@id" in value:
+        return f"<{value['@id']}>"
+    literal = value["@value"]
+    datatype = value.get("@type")
+    if datatype == "@json":
+        literal, datatype = json.dumps(literal, sort_keys=True, separators=(",", ":")), RDF_JSON
+    elif isinstance(literal, bool):
+        literal, datatype = str(literal).lower(), XSD + "boolean"
+    elif isinstance(literal, int):
+        literal, datatype = str(literal), XSD + "integer"
+    elif isinstance(literal, float):
+        literal, datatype = repr(literal), XSD + "double"
+    escaped = (
+        literal.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    )
+    return f'"{escaped}"' + (f"^^<{datatype}>" if datatype else "")
+
+
+def to_ntriples(node):
+    """N-Triples lines for an Expanded node."""
+    subject = f"<{node.id}>"
+    lines = [f"{subject} <{RDF_TYPE}> <{t}> ." for t in node.types]
+    for predicate, objects in node.properties.items():
+        lines.extend(f"{subject} <{predicate}> {_nt_literal(o)} ." for o in objects)
+    return lines
+
+
+def to_expanded_jsonld(node):
+    document = {"@id": node.id}
+    if node.types:
+        document["@type"] = node.types
+    document.update(node.properties)
+    return document
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dump the collections as expanded JSON-LD or N-Triples")
+    parser.add_argument("collections", nargs="*", metavar="COLLECTION", help="Collections to dump (default: all)")
+    parser.add_argument("--format", default="nt", choices=["nt", "jsonld"])
+    parser.add_argument("--output", help="Output file, or - for stdout (default: _build/obs4ref-cv.<format>)")
+    args = parser.parse_args()
+
+    cache = ContextCache()
+    names = args.collections or cache.store.collections
+    unknown = [n for n in names if n not in cache.store]
+    if unknown:
+        print(f"error: unknown collection(s): {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+    output = args.output or str(BUILD_DIR / f"obs4ref-cv.{args.format}")
+    if output != "-":
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+    out = sys.stdout if output == "-" else open(output, "w")
+
+    count = 0
+    if args.format == "nt":
+        for name in names:
+            for node in cache.expand_collection(name):
+                out.write("\n".join(to_ntriples(node)) + "\n")
+                count += 1
+    else:
+        out.write("[\n")
+        for name in names:
+            for node in cache.expand_collection(name):
+                out.write(("" if count == 0 else ",\n") + json.dumps(to_expanded_jsonld(node), sort_keys=True))
+                count += 1
+        out.write("\n]\n")
+
+    if out is not sys.stdout:
+        out.close()
+        print(f"Wrote {count} term(s) from {len(names)} collection(s) to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
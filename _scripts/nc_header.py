@@ -0,0 +1,196 @@
+"""
+Read the global attributes of a netCDF file without touching its data.
+
+netCDF classic files (CDF-1, CDF-2 and CDF-5) are parsed directly: the
+global attributes come right after the dimension list, so only the first
+few kilobytes of the file are read. netCDF-4 files are HDF5 and are read
+through h5py when it is installed, which also only loads the attribute
+messages. Header dumps (JSON or `ncdump -h` text) are parsed as well, so
+the validators can run where no netCDF library is available.
+"""
+
+import json
+import re
+import struct
+
+
+HDF5_MAGIC = b"\x89HDF\r\n\x1a\n"
+CLASSIC_MAGIC = b"CDF"
+READ_SIZE = 8 * 1024
+MAX_DUMP_SIZE = 16 * 1024 * 1024
+
+NC_DIMENSION = 0x0A
+NC_ATTRIBUTE = 0x0C
+
+# nc_type -> (struct code, size)
+NC_TYPES = {
+    1: ("b", 1),
+    2: ("c", 1),
+    3: ("h", 2),
+    4: ("i", 4),
+    5: ("f", 4),
+    6: ("d", 8),
+    7: ("B", 1),
+    8: ("H", 2),
+    9: ("I", 4),
+    10: ("q", 8),
+    11: ("Q", 8),
+}
+
+
+class HeaderError(ValueError):
+    pass
+
+
+class _ClassicReader:
+    """Big-endian reader pulling more of the file only when needed."""
+
+    def __init__(self, fh, version):
+        self.fh = fh
+        self.buf = b""
+        self.pos = 0
+        self.size_fmt = ">q" if version == 5 else ">i"
+        self.size_len = 8 if version == 5 else 4
+
+    def read(self, n):
+        while len(self.buf) - self.pos < n:
+            chunk = self.fh.read(max(READ_SIZE, n))
+            if not chunk:
+                raise HeaderError("truncated netCDF header")
+            self.buf = self.buf[self.pos :] + chunk
+            self.pos = 0
+        data = self.buf[self.pos : self.pos + n]
+        self.pos += n
+        return data
+
+    def int32(self):
+        return struct.unpack(">i", self.read(4))[0]
+
+    def size(self):
+        return struct.unpack(self.size_fmt, self.read(self.size_len))[0]
+
+    def padded(self, n):
+        data = self.read(n)
+        self.read((4 - n % 4) % 4)
+        return data
+
+    def name(self):
+        return self.padded(self.size()).decode("utf-8")
+
+
+def _read_classic(fh, version):
+    reader = _ClassicReader(fh, version)
+    reader.size()  # numrecs
+
+    tag, count = reader.int32(), reader.size()
+    if tag == NC_DIMENSION:
+        for _ in range(count):
+            reader.name()
+            reader.size()
+    elif tag != 0:
+        raise HeaderError(f"unexpected dimension tag {tag:#x}")
+
+    attributes = {}
+    tag, count = reader.int32(), reader.size()
+    if tag == NC_ATTRIBUTE:
+        for _ in range(count):
+            name = reader.name()
+            nc_type = reader.int32()
+            nelems = reader.size()
+            if nc_type not in NC_TYPES:
+                raise HeaderError(f"{name}: unknown nc_type {nc_type}")
+            code, width = NC_TYPES[nc_type]
+            raw = reader.padded(nelems * width)
+            if nc_type == 2:
+                attributes[name] = raw.rstrip(b"\x00").decode("utf-8", errors="replace")
+            else:
+                values = struct.unpack(f">{nelems}{code}", raw)
+                attributes[name] = values[0] if nelems == 1 else list(values)
+    elif tag != 0:
+        raise HeaderError(f"unexpected attribute tag {tag:#x}")
+    return attributes
+
+
+def _read_hdf5(path):
+    try:
+        import h5py
+    except ImportError:
+        raise HeaderError("netCDF-4/HDF5 file: install h5py or pass a header dump") from None
+
+    attributes = {}
+    with h5py.File(path, "r") as fh:
+        for name, value in fh.attrs.items():
+            if isinstance(value, bytes):
+                value = value.decode("utf-8", errors="replace")
+            elif hasattr(value, "tolist"):
+                value = value.tolist()
+                if isinstance(value, list) and len(value) == 1:
+                    value = value[0]
+            if isinstance(value, bytes):
+                value = value.decode("utf-8", errors="replace")
+            attributes[name] = value
+    return attributes
+
+
+_NCDUMP_ATTR = re.compile(r"^\s*:(?P<name>[^\s=]+)\s*=\s*(?P<value>.*?)\s*;\s*$")
+_NCDUMP_STRING = re.compile(r'"((?:[^"\\]|\\.)*)"')
+_NCDUMP_NUMBER = re.compile(r"^(-?[\d.eE+-]+)[bBsSfFdDlLuU]*$")
+
+
+def _ncdump_value(text):
+    strings = _NCDUMP_STRING.findall(text)
+    if strings:
+        value = "".join(strings)
+        return value.encode().decode("unicode_escape") if "\\" in value else value
+    numbers = []
+    for item in text.split(","):
+        match = _NCDUMP_NUMBER.match(item.strip())
+        if match is None:
+            return text
+        number = float(match.group(1))
+        numbers.append(int(number) if number.is_integer() and "." not in match.group(1) else number)
+    return numbers[0] if len(numbers) == 1 else numbers
+
+
+def parse_ncdump(text):
+    """Global attributes from `ncdump -h` output."""
+    attributes = {}
+    in_globals = False
+    for line in text.splitlines():
+        if line.strip().startswith("// global attributes"):
+            in_globals = True
+            continue
+        if not in_globals:
+            continue
+        match = _NCDUMP_ATTR.match(line)
+        if match:
+            attributes[match.group("name")] = _ncdump_value(match.group("value"))
+    return attributes
+
+
+def parse_json_dump(text):
+    """Global attributes from a JSON dump: either the attributes or {"global_attributes": {...}}."""
+    data = json.loads(text)
+    if isinstance(data, dict) and isinstance(data.get("global_attributes"), dict):
+        return data["global_attributes"]
+    if isinstance(data, dict) and isinstance(data.get("attributes"), dict):
+        return data["attributes"]
+    return data
+
+
+def read_global_attributes(path):
+    """Return the global attributes of a netCDF file or header dump."""
+    with open(path, "rb") as fh:
+        magic = fh.read(8)
+        if magic[:3] == CLASSIC_MAGIC and len(magic) >= 4 and magic[3] in (1, 2, 5):
+            fh.seek(4)
+            return _read_classic(fh, magic[3])
+        if magic == HDF5_MAGIC:
+            return _read_hdf5(path)
+        text = (magic + fh.read(MAX_DUMP_SIZE)).decode("utf-8", errors="replace")
+
+    if text.lstrip().startswith("{"):
+        return parse_json_dump(text)
+    if text.lstrip().startswith("netcdf "):
+        return parse_ncdump(text)
+    raise HeaderError("not a netCDF file or header dump")
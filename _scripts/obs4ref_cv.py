@@ -0,0 +1,141 @@
+"""
+obs4ref-cv: one command for the CV tooling.
+
+Each subcommand runs one of the repository's scripts, which is only
+imported once its subcommand is chosen, so a command never pays for the
+imports of another (PyYAML, numpy, requests, esgvoc):
+
+  check      duplicate term ids            _scripts/check-cv-entry-filenames.py
+  validate   term files                    _scripts/validate_cv.py
+  drs        DRS names                     _scripts/drs_validate.py
+  changelog  CV changes since a commit     .github/scripts/ci_changelog.py
+  sync       collections from upstream     _scripts/sync_collections.py
+  export     CMOR _CVs aggregates          _scripts/export_cmor_cvs.py
+  lookup     terms, read from the compiled bundle (see cv_bundle.py)
+
+Arguments after the subcommand go to the script unchanged, so
+"obs4ref-cv drs names.txt --failures-only" is
+"python _scripts/drs_validate.py names.txt --failures-only".
+
+The scripts are run from the checkout: install the project in editable
+mode (uv sync, or pip install -e .), or set OBS4REF_REPO to the checkout.
+
+Usage:
+  obs4ref-cv <command> [ARGS...]
+  obs4ref-cv lookup COLLECTION ID... [--bundle PATH]
+"""
+
+import collections
+import os
+import sys
+from pathlib import Path
+
+
+# in_repo: run from the checkout (git commands); others keep the caller's
+# directory so relative file arguments work
+Command = collections.namedtuple("Command", "script help in_repo", defaults=(False,))
+
+COMMANDS = {
+    "check": Command("_scripts/check-cv-entry-filenames.py", "Check for duplicate term ids"),
+    "validate": Command("_scripts/validate_cv.py", "Validate every term file"),
+    "drs": Command("_scripts/drs_validate.py", "Validate file names, dataset ids or directories"),
+    "changelog": Command(".github/scripts/ci_changelog.py", "Changelog of the CV changes since a commit", True),
+    "sync": Command("_scripts/sync_collections.py", "Synchronise the collections with upstream"),
+    "export": Command("_scripts/export_cmor_cvs.py", "Regenerate the CMOR _CVs aggregates"),
+}
+
+
+def repo_root():
+    """The checkout holding the scripts: OBS4REF_REPO, else the one this file lives in."""
+    if os.environ.get("OBS4REF_REPO"):
+        return Path(os.environ["OBS4REF_REPO"]).resolve()
+    root = Path(__file__).resolve().parents[1]
+    if not (root / "_scripts" / "cv_common.py").exists():
+        raise FileNotFoundError(
+            "obs4ref-cv is not running from a checkout; install it in editable mode or set OBS4REF_REPO"
+        )
+    return root
+
+
+def run_script(path, args):
+    """Run a script as __main__ with the given arguments, as python would."""
+    import runpy
+
+    sys.argv = [str(path), *args]
+    sys.path.insert(0, str(path.parent))
+    runpy.run_path(str(path), run_name="__main__")
+
+
+def lookup(root, args):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="obs4ref-cv lookup", description="Print terms from the compiled bundle")
+    parser.add_argument("collection")
+    parser.add_argument("term_ids", nargs="+", metavar="ID")
+    parser.add_argument("--bundle", help="Bundle path (default: $OBS4REF_BUNDLE, else the current cv_version)")
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, str(root / "_scripts"))
+    from cv_bundle import CVBundle, default_bundle_path
+
+    bundle_path = args.bundle or os.environ.get("OBS4REF_BUNDLE")
+    if bundle_path:
+        path = Path(bundle_path)
+    else:
+        # Only the default path needs the manifest (and so PyYAML)
+        from cv_common import load_manifest
+
+        path = default_bundle_path(load_manifest()["cv_version"])
+    if not path.exists():
+        print(f"error: no bundle at {path}; build one with 'python _scripts/cv_bundle.py build'", file=sys.stderr)
+        sys.exit(1)
+
+    missing = 0
+    out = sys.stdout
+    with CVBundle(path) as bundle:
+        for term_id in args.term_ids:
+            raw = bundle.get_raw(args.collection, term_id.lower())
+            if raw is None:
+                missing += 1
+                print(f"error: {args.collection}/{term_id} not found", file=sys.stderr)
+            else:
+                out.write(raw.decode() + "\n")
+    if missing:
+        sys.exit(1)
+
+
+def usage():
+    lines = [__doc__.strip().split("\n", 1)[0], "", "Commands:"]
+    lines.extend(f"  {name:<10} {command.help}" for name, command in COMMANDS.items())
+    lines.append(f"  {'lookup':<10} Print terms from the compiled bundle")
+    lines.extend(["", "Run 'obs4ref-cv <command> --help' for the options of a command."])
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    # No argparse here: dispatching must stay cheaper than the command
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return
+    name, args = argv[0], argv[1:]
+    if name != "lookup" and name not in COMMANDS:
+        print(f"error: unknown command {name!r}\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        root = repo_root()
+    except FileNotFoundError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    if name == "lookup":
+        lookup(root, args)
+    else:
+        command = COMMANDS[name]
+        if command.in_repo:
+            os.chdir(root)
+        run_script(root / command.script, args)
+
+
+if __name__ == "__main__":
+    main()
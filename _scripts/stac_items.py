@@ -0,0 +1,314 @@
+"""
+Stream STAC items for datasets, driven by catalog_specs.yaml.
+
+catalog_specs.yaml is compiled once into a flat list of fields: the
+catalog field name, the collection it comes from, an optional
+source_collection_key to resolve through the term (e.g. the description
+of a grid_label) and its string / string_array value type. Keyed fields
+are resolved through per-collection lookup tables built once from the
+term files, optionally enriched with universe attributes (--terms), so
+building an item is a few dict lookups. Items are written as
+newline-delimited JSON while reading the input, and the collection
+summary only keeps the distinct values per field. A
+source_collection_term (e.g. version: creationdatenb) requires the value
+to match that term's pattern; other values are reported as invalid.
+
+STAC needs a datetime or a start_datetime/end_datetime pair. The pair is
+taken from the time_range of the record and of each file (given, or
+split from the file name as in drs_specs.yaml), parsed by time_range.py
+with the frequency of the dataset. end_datetime is the last second of
+the last time step: 201001-201012 at mon covers 2010-01-01T00:00:00Z to
+2010-12-31T23:59:59Z, and 201001010000-201001011800 at 6hr ends at
+2010-01-01T23:59:59Z. For frequencies without a fixed step it is the
+last time point. The collection extent spans every item.
+
+Input lines are either dataset ids or JSON records, such as the output
+of drs_parse.py:
+  {"dataset_id": "...", "facets": {...}, "realm": "atmos", ...,
+   "files": [{"href": "...", "tracking_id": "...", "size": 123}]}
+
+Usage:
+  python _scripts/stac_items.py [INPUT|-] [--terms FILE] [--collection-output FILE] [--strict]
+"""
+
+import argparse
+import collections
+import json
+import re
+import sys
+
+import numpy as np
+
+from cv_common import REPO_ROOT, TERM_PATTERNS, iter_term_files, load_json, load_yaml
+from drs_parse import DrsParser
+from drs_validate import read_names
+from time_range import TimeRangeEngine, split_file_names
+
+
+STAC_VERSION = "1.0.0"
+
+Field = collections.namedtuple("Field", "name collection key term value_type is_required")
+
+
+def compile_fields(section):
+    """Flatten a dataset_properties/file_properties list; later duplicates replace earlier ones."""
+    fields = {}
+    for prop in section or []:
+        collection = prop.get("source_collection")
+        name = prop.get("catalog_field_name") or collection
+        fields[name] = Field(
+            name,
+            collection,
+            prop.get("source_collection_key"),
+            prop.get("source_collection_term"),
+            prop.get("catalog_field_value_type", "string"),
+            prop.get("is_required", False),
+        )
+    return list(fields.values())
+
+
+def build_lookup_tables(collections_needed, terms=None, repo_root=REPO_ROOT):
+    """Return {collection: {lowercased id: term dict}} for the keyed collections."""
+    tables = {}
+    for collection in collections_needed:
+        table = {}
+        for term_file in iter_term_files(repo_root / collection):
+            term = load_json(term_file)
+            table[term.get("id", term_file.stem).lower()] = term
+        for term_id, extra in ((terms or {}).get(collection) or {}).items():
+            table.setdefault(term_id.lower(), {}).update(extra)
+        tables[collection] = table
+    return tables
+
+
+def _term_matcher(term_id):
+    """Return a function telling whether a value stands for the term: its pattern, else its id."""
+    if term_id in TERM_PATTERNS:
+        pattern = re.compile(TERM_PATTERNS[term_id])
+        return lambda value: pattern.fullmatch(value.lower()) is not None
+    return lambda value: value.lower() == term_id.lower()
+
+
+def _iso(value):
+    return f"{np.datetime_as_string(value, unit='s')}Z"
+
+
+class StacItemBuilder:
+    """Turns dataset records into STAC items following catalog_specs.yaml."""
+
+    def __init__(self, catalog_specs=None, terms=None, repo_root=REPO_ROOT):
+        if catalog_specs is None:
+            catalog_specs = load_yaml(repo_root / "catalog_specs.yaml")
+
+        properties = catalog_specs["catalog_properties"]
+        self.regex_id = re.compile(properties["regex_id"])
+        self.extensions = [
+            properties["url_template"].format(extension_name=ext["name"], extension_version=ext["version"])
+            for ext in properties.get("extensions", [])
+        ]
+        self.dataset_fields = compile_fields(catalog_specs.get("dataset_properties"))
+        self.file_fields = compile_fields(catalog_specs.get("file_properties"))
+
+        keyed = {f.collection for f in self.dataset_fields + self.file_fields if f.key and f.collection}
+        self.tables = build_lookup_tables(sorted(keyed), terms, repo_root)
+        self.matchers = {f.term: _term_matcher(f.term) for f in self.dataset_fields + self.file_fields if f.term}
+        self.time_ranges = TimeRangeEngine(repo_root)
+        self.drs_specs = load_yaml(repo_root / "drs_specs.yaml")
+
+        self.summaries = collections.defaultdict(set)
+        self.interval = None
+
+    def _resolve(self, field, record):
+        """Return the value of a field for a record, or None if unavailable."""
+        value = record.get(field.collection or field.name)
+        if value is None:
+            return None
+        if field.key:
+            values = value if isinstance(value, list) else [value]
+            resolved = []
+            for v in values:
+                term = self.tables[field.collection].get(str(v).lower())
+                if term is None or term.get(field.key) is None:
+                    return None
+                resolved.append(term[field.key])
+            value = resolved if isinstance(value, list) else resolved[0]
+
+        if field.value_type == "string_array":
+            return value if isinstance(value, list) else [value]
+        if isinstance(value, list):
+            return value[0] if len(value) == 1 else None
+        return value
+
+    def _properties(self, fields, record, problems, prefix=""):
+        props = {}
+        for field in fields:
+            value = self._resolve(field, record)
+            if value is None:
+                if field.is_required:
+                    problems.append(f"missing {prefix}{field.name}")
+                continue
+            if field.term:
+                invalid = [
+                    v for v in (value if isinstance(value, list) else [value])
+                    if not isinstance(v, str) or not self.matchers[field.term](v)
+                ]
+                if invalid:
+                    problems.append(f"invalid {prefix}{field.name} {invalid[0]!r} (not a {field.term})")
+                    continue
+            props[field.name] = value
+        return props
+
+    def _time_ranges(self, record):
+        """(frequencies, ranges) of the time ranges of the record and its files."""
+        frequency = record.get("frequency") or ""
+        values = record.get("time_range") or []
+        pairs = [(frequency, v) for v in ([values] if isinstance(values, str) else values)]
+        names = []
+        for file in record.get("files") or []:
+            if file.get("time_range") is not None:
+                pairs.append((frequency, file["time_range"]))
+            else:
+                names.append(file.get("href", "").rsplit("/", 1)[-1])
+        if names:
+            frequencies, ranges, _ = split_file_names(names, self.drs_specs)
+            pairs.extend((f or frequency, r) for f, r in zip(frequencies, ranges) if r is not None)
+        return [f for f, _ in pairs], [str(r) for _, r in pairs]
+
+    def _datetimes(self, record, problems):
+        """datetime, start_datetime and end_datetime properties of a record."""
+        if "start_datetime" in record and "end_datetime" in record:
+            start, end = record["start_datetime"], record["end_datetime"]
+        else:
+            frequencies, ranges = self._time_ranges(record)
+            parsed = self.time_ranges.parse_files(frequencies, ranges)
+            problems.extend(f"invalid time_range ({reason})" for _, reason in parsed.errors)
+            if not parsed.valid.any():
+                if record.get("datetime") is None:
+                    problems.append("missing datetime (no valid time_range)")
+                return {"datetime": record.get("datetime")}
+            # parse_files ends stepped ranges after their last step (exclusive)
+            ends = parsed.end.astype("datetime64[s]") - parsed.stepped.astype("timedelta64[s]")
+            start = _iso(parsed.start[parsed.valid].min())
+            end = _iso(ends[parsed.valid].max())
+        # RFC 3339 strings in UTC sort chronologically
+        if self.interval is None:
+            self.interval = [start, end]
+        else:
+            self.interval = [min(self.interval[0], start), max(self.interval[1], end)]
+        return {"datetime": record.get("datetime"), "start_datetime": start, "end_datetime": end}
+
+    def build(self, record, dataset_id):
+        """Return (item, problems): missing required fields and invalid values."""
+        problems = []
+        properties = self._properties(self.dataset_fields, record, problems)
+        properties.update(self._datetimes(record, problems))
+
+        assets = {}
+        for i, file in enumerate(record.get("files") or []):
+            href = file.get("href", "")
+            asset = {"href": href, "roles": ["data"]}
+            asset.update(self._properties(self.file_fields, file, problems, prefix=f"files[{i}]."))
+            for key in ("size", "checksum"):
+                if key in file:
+                    asset[f"file:{key}"] = file[key]
+            assets[href.rsplit("/", 1)[-1] or f"file{i}"] = asset
+
+        for name, value in properties.items():
+            if name.endswith("datetime"):
+                continue
+            for v in value if isinstance(value, list) else [value]:
+                self.summaries[name].add(v)
+
+        item = {
+            "type": "Feature",
+            "stac_version": STAC_VERSION,
+            "stac_extensions": self.extensions,
+            "id": dataset_id,
+            "geometry": None,
+            "properties": properties,
+            "links": [],
+            "assets": assets,
+        }
+        return item, problems
+
+    def collection(self, collection_id, description):
+        """STAC collection with summaries of every field seen so far."""
+        return {
+            "type": "Collection",
+            "stac_version": STAC_VERSION,
+            "stac_extensions": self.extensions,
+            "id": collection_id,
+            "description": description,
+            "license": "other",
+            "extent": {
+                "spatial": {"bbox": [[-180, -90, 180, 90]]},
+                "temporal": {"interval": [self.interval or [None, None]]},
+            },
+            "summaries": {name: sorted(values) for name, values in sorted(self.summaries.items())},
+            "links": [],
+        }
+
+
+def iter_records(lines, parser):
+    """Yield (dataset_id, record) from dataset id or JSON lines; failures have a None id."""
+    for line in lines:
+        if line.startswith("{"):
+            record = json.loads(line)
+            if "facets" in record:
+                record = {**record.pop("facets"), **record}
+        else:
+            record = {"dataset_id": line}
+
+        dataset_id = record.get("dataset_id")
+        if dataset_id is None or "activity_id" not in record:
+            parsed = parser.parse_dataset_id(dataset_id) if dataset_id else None
+            if parsed is None or not parsed.ok:
+                yield None, record
+                continue
+            record = {**parsed.facets._asdict(), **record}
+        yield dataset_id, record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build STAC items from dataset records")
+    parser.add_argument("input", nargs="?", default="-", help="Dataset ids or JSON records, one per line")
+    parser.add_argument("--terms", help="JSON {collection: {id: {key: value}}} with universe attributes")
+    parser.add_argument("--collection-output", help="Also write the STAC collection to this file")
+    parser.add_argument("--strict", action="store_true", help="Skip items with missing or invalid fields")
+    args = parser.parse_args()
+
+    terms = load_json(args.terms) if args.terms else None
+    builder = StacItemBuilder(terms=terms)
+    drs_parser = DrsParser("dataset_id", terms=terms)
+    project = load_yaml(REPO_ROOT / "project_specs.yaml")
+
+    fh = sys.stdin if args.input == "-" else open(args.input)
+    written = skipped = incomplete = 0
+    for dataset_id, record in iter_records(read_names(fh), drs_parser):
+        if dataset_id is None or builder.regex_id.fullmatch(dataset_id) is None:
+            print(f"error: not a valid dataset id: {record.get('dataset_id')!r}", file=sys.stderr)
+            skipped += 1
+            continue
+        item, problems = builder.build(record, dataset_id)
+        if problems:
+            incomplete += 1
+            print(f"{'error' if args.strict else 'warning'}: {dataset_id}: {', '.join(problems)}", file=sys.stderr)
+            if args.strict:
+                skipped += 1
+                continue
+        sys.stdout.write(json.dumps(item, separators=(",", ":")) + "\n")
+        written += 1
+    if fh is not sys.stdin:
+        fh.close()
+
+    if args.collection_output:
+        with open(args.collection_output, "w") as out:
+            json.dump(builder.collection(project["project_id"], f"{project['drs_name']} datasets"), out, indent=2)
+
+    print(f"Wrote {written} item(s), skipped {skipped}, {incomplete} incomplete.", file=sys.stderr)
+    if skipped:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
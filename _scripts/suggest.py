@@ -0,0 +1,246 @@
+"""
+Nearest-term suggestions for DRS parts that failed validation.
+
+Each collection gets an index over its term ids, keyed on a normalised
+form that ignores case and the separators - _ . and space, so
+"HadCRUT5_0_2_0" lands on hadcrut5-0-2-0 at distance 0 and "gr1x" finds
+gr1a and gr1g at distance 1. The index is a symmetric deletion
+neighbourhood (see DeletionIndex): a query looks up the strings its
+deletions lead to and computes exact edit distances for the handful of
+keys found, so lookups stay well under a millisecond. A BK-tree prunes
+too little here: ids are ~7 characters and suggestions reach distance 3,
+so most of the tree is within range of any query.
+
+Bulk mode reads a drs_validate.py report (tsv or jsonl) and appends the
+suggestions to every failure; repeated (part, value) pairs are resolved
+once.
+
+Usage:
+  python _scripts/suggest.py term COLLECTION VALUE [-k N] [--max-distance D]
+  python _scripts/suggest.py report [REPORT|-] [-k N] [--max-distance D]
+
+  python _scripts/drs_validate.py names.txt --failures-only | python _scripts/suggest.py report
+"""
+
+import argparse
+import json
+import re
+import sys
+
+from cv_common import REPO_ROOT, load_term_ids
+
+
+DEFAULT_K = 3
+DEFAULT_MAX_DISTANCE = 3
+
+_SEPARATORS = re.compile(r"[-_. ]")
+
+
+def normalise(value):
+    """Matching key: lowercase, without separators."""
+    return _SEPARATORS.sub("", value.lower())
+
+
+def distance_to(pattern):
+    """Return a function giving the edit distance from pattern to its argument.
+
+    Bit-parallel Levenshtein (Myers / Hyyro): the pattern is encoded once,
+    then each comparison is a few integer operations per character.
+    """
+    m = len(pattern)
+    if m == 0:
+        return len
+    peq = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+
+    def distance(text):
+        pv, mv, score = mask, 0, m
+        for char in text:
+            eq = peq.get(char, 0)
+            xv = eq | mv
+            xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+            ph = (mv | ~(xh | pv)) & mask
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = ((ph << 1) | 1) & mask
+            mh = (mh << 1) & mask
+            pv = (mh | ~(xv | ph)) & mask
+            mv = ph & xv
+        return score
+
+    return distance
+
+
+def _deletes(key):
+    """Strings obtained from key by deleting one character."""
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+class DeletionIndex:
+    """Symmetric deletion index over normalised keys.
+
+    Every key is stored under all strings reachable by deleting up to
+    max_distance of its characters. Two keys within edit distance d share
+    such a string after at most d deletions from each, so a query only
+    expands its own deletions level by level and checks the few keys found
+    there with the exact distance. Candidates within distance i all turn up
+    by level i, so the search stops at the first level that already has k
+    of them.
+    """
+
+    __slots__ = ("max_distance", "keys", "_neighbours")
+
+    def __init__(self, ids=(), max_distance=DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.keys = {}
+        self._neighbours = {}
+        for term_id in ids:
+            self.add(term_id)
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.keys.values())
+
+    def add(self, term_id):
+        key = normalise(term_id)
+        if key in self.keys:
+            self.keys[key].append(term_id)
+            return
+        self.keys[key] = [term_id]
+        level = {key}
+        for _ in range(self.max_distance + 1):
+            for variant in level:
+                self._neighbours.setdefault(variant, set()).add(key)
+            level = {d for variant in level for d in _deletes(variant)}
+
+    def nearest(self, value, k=DEFAULT_K, max_distance=None):
+        """[(distance, id)] of the k closest ids within max_distance, closest first."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        key = normalise(value)
+        distance_from_key = distance_to(key)
+        distances = {}
+        level = {key}
+        for depth in range(max_distance + 1):
+            for variant in level:
+                for candidate in self._neighbours.get(variant, ()):
+                    if candidate not in distances:
+                        distances[candidate] = distance_from_key(candidate)
+            found = sorted(
+                (d, term_id) for candidate, d in distances.items() if d <= depth for term_id in self.keys[candidate]
+            )
+            if len(found) >= k or depth == max_distance:
+                return found[:k]
+            level = {d for variant in level for d in _deletes(variant)}
+        return []
+
+
+class Suggester:
+    """One DeletionIndex per collection, built on first use."""
+
+    def __init__(self, repo_root=REPO_ROOT):
+        self.repo_root = repo_root
+        self._trees = {}
+
+    def tree(self, collection):
+        tree = self._trees.get(collection)
+        if tree is None:
+            ids = sorted({i.lower() for i in load_term_ids(collection, self.repo_root)})
+            tree = self._trees[collection] = DeletionIndex(ids)
+        return tree
+
+    def suggest(self, collection, value, k=DEFAULT_K, max_distance=DEFAULT_MAX_DISTANCE):
+        return self.tree(collection).nearest(value, k, max_distance)
+
+    def suggest_many(self, pairs, k=DEFAULT_K, max_distance=DEFAULT_MAX_DISTANCE):
+        """{(collection, value): suggestions} for an iterable of pairs, each resolved once."""
+        return {
+            (collection, value): self.suggest(collection, value, k, max_distance)
+            for collection, value in dict.fromkeys(pairs)
+        }
+
+
+def parse_report_line(line):
+    """(line, collection, value) for a failure of a drs_validate.py report, else (line, None, None)."""
+    if line.startswith("{"):
+        verdict = json.loads(line)
+        if not verdict.get("ok") and verdict.get("part") and verdict.get("value"):
+            return line, verdict["part"], verdict["value"]
+        return line, None, None
+    fields = line.split("\t")
+    if len(fields) >= 4 and fields[1] == "FAIL" and fields[2] and fields[3]:
+        return line, fields[2], fields[3]
+    return line, None, None
+
+
+def _format(suggestions):
+    return ", ".join(term_id for _, term_id in suggestions)
+
+
+def cmd_term(args, suggester):
+    try:
+        suggestions = suggester.suggest(args.collection, args.value, args.k, args.max_distance)
+    except FileNotFoundError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    for distance, term_id in suggestions:
+        print(f"{term_id}\t{distance}")
+
+
+def cmd_report(args, suggester):
+    fh = sys.stdin if args.report == "-" else open(args.report)
+    entries = [parse_report_line(line.rstrip("\r\n")) for line in fh if line.strip()]
+    if fh is not sys.stdin:
+        fh.close()
+
+    pairs = [(collection, value) for _, collection, value in entries if collection]
+    try:
+        suggestions = suggester.suggest_many(pairs, args.k, args.max_distance)
+    except FileNotFoundError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    for line, collection, value in entries:
+        if collection is None:
+            print(line)
+        elif line.startswith("{"):
+            verdict = json.loads(line)
+            verdict["suggestions"] = [term_id for _, term_id in suggestions[collection, value]]
+            print(json.dumps(verdict))
+        else:
+            print(f"{line}\t{_format(suggestions[collection, value])}")
+
+
+def main():
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("-k", type=int, default=DEFAULT_K, help="Suggestions per value (default: %(default)s)")
+    options.add_argument(
+        "--max-distance", type=int, default=DEFAULT_MAX_DISTANCE,
+        help="Largest edit distance to suggest (default: %(default)s)",
+    )
+
+    parser = argparse.ArgumentParser(description="Suggest the closest valid terms for rejected values")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    term_parser = sub.add_parser("term", parents=[options], help="Suggestions for one value")
+    term_parser.add_argument("collection")
+    term_parser.add_argument("value")
+
+    report_parser = sub.add_parser("report", parents=[options], help="Annotate the failures of a drs_validate.py report")
+    report_parser.add_argument("report", nargs="?", default="-", help="Report file (default: stdin)")
+
+    args = parser.parse_args()
+
+    commands = {
+        "term": cmd_term,
+        "report": cmd_report,
+    }
+    commands[args.command](args, Suggester())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Synchronise the collections with the CMOR tables and the esgvoc universe.
+
+Runs the work of the create_*.py generators for every collection at
+once: the universe data descriptors are loaded once up front, then the
+upstream CMOR tables are fetched and matched concurrently. For each
+collection the result is a plan of the term files to add, update,
+remove or leave alone; files are compared as parsed JSON, so only files
+whose content changes are written and a file differing only in
+whitespace or key order is left alone (and keeps its mtime).
+
+source_id is curated: only the sources already in the repository are
+kept in sync, new upstream sources are listed as candidates, and a source
+is only removed once the universe no longer knows it. Removals are only
+applied with --prune.
+
+Usage:
+  python _scripts/sync_collections.py [COLLECTION...] [--dry-run] [--prune]
+                                      [--jobs N] [--format text|json]
+"""
+
+import argparse
+import collections
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cv_common import REPO_ROOT, CONTEXT_FILENAME, iter_term_files
+from fetch import fetch_json, fetch_json_many
+from instrument import count, span
+from universe import TermIndex
+
+
+CMOR_TABLES_URL = "https://raw.githubusercontent.com/PCMDI/obs4MIPs-cmor-tables/refs/heads/master"
+CMOR_TABLE_DIR_URL = "https://api.github.com/repos/PCMDI/obs4MIPs-cmor-tables/contents/Tables"
+
+Generator = collections.namedtuple("Generator", "collection data_descriptors upstream curated")
+
+Plan = collections.namedtuple("Plan", "collection add update remove unchanged candidates unknown")
+
+
+def cmor_names(name):
+    """Entry names of obs4MIPs_<name>.json, looking through nested version_metadata layouts."""
+    content = fetch_json(f"{CMOR_TABLES_URL}/obs4MIPs_{name}.json")[name]
+    if isinstance(content, dict) and name in content:
+        content = content[name]
+    return list(content)
+
+
+def cmor_variables():
+    """Variable entries of the CMOR tables, as in create_variable_id.py."""
+    tables = fetch_json(CMOR_TABLE_DIR_URL)
+    names = []
+    # The last table is left out, as create_variable_id.py does
+    for table in fetch_json_many(item["download_url"] for item in tables[:-1]):
+        if "variable_entry" not in table:
+            table = table[next(iter(table))]
+        names.extend(table.get("variable_entry", ()))
+    return sorted(set(names))
+
+
+GENERATORS = {
+    "grid_label": Generator("grid_label", ("grid",), lambda: cmor_names("grid_label"), False),
+    "institution_id": Generator(
+        "institution_id", ("institution", "consortium", "organisation"), lambda: cmor_names("institution_id"), False
+    ),
+    "nominal_resolution": Generator(
+        "nominal_resolution", ("resolution",), lambda: cmor_names("nominal_resolution"), False
+    ),
+    "region": Generator("region", ("region",), lambda: cmor_names("region"), False),
+    "source_id": Generator("source_id", ("source",), lambda: cmor_names("source_id"), True),
+    "source_type": Generator("source_type", ("obs_type",), lambda: cmor_names("source_type"), False),
+    "variable_id": Generator("variable_id", ("variable",), cmor_variables, False),
+}
+
+
+def serialise(term):
+    """Term file content, exactly as the create_*.py generators write it."""
+    return json.dumps({"@context": CONTEXT_FILENAME, "id": term.id, "type": term.type}, indent=4)
+
+
+def _same_content(path, text):
+    """Whether a term file holds the same JSON as text, whatever its layout."""
+    try:
+        return json.loads(path.read_bytes()) == json.loads(text)
+    except ValueError:
+        return False
+
+
+def plan_collection(generator, repo_root=REPO_ROOT):
+    """Return (Plan, {file name: content to write}) for one collection."""
+    with span("plan", collection=generator.collection):
+        return _plan_collection(generator, repo_root)
+
+
+def _plan_collection(generator, repo_root):
+    index = TermIndex(*generator.data_descriptors)
+    wanted = {}
+    unknown = []
+    for name in generator.upstream():
+        term = index.get(name)
+        if term is None:
+            unknown.append(name)
+        else:
+            wanted[f"{term.id}.json"] = serialise(term)
+
+    directory = Path(repo_root) / generator.collection
+    existing = {path.name: path for path in iter_term_files(directory)} if directory.exists() else {}
+
+    candidates = []
+    if generator.curated:
+        # Keep the selection; only refresh it from the universe
+        candidates = sorted(set(wanted) - set(existing))
+        known = {f"{t.id}.json": serialise(t) for t in (index.get(Path(n).stem) for n in existing) if t}
+        wanted = {name: content for name, content in {**known, **wanted}.items() if name in existing}
+
+    add, update, unchanged = [], [], []
+    for name in sorted(wanted):
+        if name not in existing:
+            add.append(name)
+        elif not _same_content(existing[name], wanted[name]):
+            update.append(name)
+        else:
+            unchanged.append(name)
+    remove = sorted(set(existing) - set(wanted))
+
+    plan = Plan(generator.collection, add, update, remove, unchanged, candidates, sorted(unknown))
+    return plan, {name: wanted[name] for name in add + update}
+
+
+def apply_plan(plan, contents, prune=False, repo_root=REPO_ROOT):
+    directory = Path(repo_root) / plan.collection
+    directory.mkdir(exist_ok=True)
+    with span("write", collection=plan.collection):
+        for name, content in contents.items():
+            (directory / name).write_text(content)
+    count("files_written", len(contents))
+    if prune:
+        for name in plan.remove:
+            (directory / name).unlink()
+
+
+def sync(names, jobs=4, repo_root=REPO_ROOT):
+    """Plan every collection concurrently; returns [(Plan, contents)] in the order of names."""
+    # One universe snapshot for all generators: load each data descriptor
+    # here, before the threads start
+    for name in names:
+        TermIndex(*GENERATORS[name].data_descriptors)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(lambda name: plan_collection(GENERATORS[name], repo_root), names))
+
+
+def format_plan(plan, prune):
+    removal = "remove" if prune else "remove (needs --prune)"
+    lines = [
+        f"{plan.collection}: {len(plan.add)} add, {len(plan.update)} update, "
+        f"{len(plan.remove)} {removal}, {len(plan.unchanged)} unchanged"
+    ]
+    for label, items in (("+", plan.add), ("~", plan.update), ("-", plan.remove)):
+        lines.extend(f"  {label} {item}" for item in items)
+    if plan.candidates:
+        lines.append(f"  upstream sources not selected: {', '.join(plan.candidates)}")
+    if plan.unknown:
+        lines.append(f"  not found in universe: {', '.join(plan.unknown)}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synchronise collections with the CMOR tables and the universe")
+    parser.add_argument("collections", nargs="*", metavar="COLLECTION", help=f"Default: {', '.join(GENERATORS)}")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    parser.add_argument("--prune", action="store_true", help="Also delete the files planned for removal")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--format", default="text", choices=["text", "json"])
+    args = parser.parse_args()
+
+    names = args.collections or list(GENERATORS)
+    unknown = set(names) - set(GENERATORS)
+    if unknown:
+        print(f"error: no generator for {', '.join(sorted(unknown))}", file=sys.stderr)
+        sys.exit(1)
+
+    results = sync(names, args.jobs)
+
+    if args.format == "json":
+        print(json.dumps([plan._asdict() for plan, _ in results], indent=2))
+    else:
+        print("\n".join(format_plan(plan, args.prune) for plan, _ in results))
+
+    if args.dry_run:
+        return
+    written = 0
+    for plan, contents in results:
+        apply_plan(plan, contents, args.prune)
+        written += len(contents)
+    print(f"Wrote {written} file(s){', pruned the removals' if args.prune else ''}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Parse and check the optional time_range part of file names in bulk.
+
+time_range/ defines one term per granularity (monthly YYYYMM-YYYYMM,
+daily YYYYMMDD-YYYYMMDD, hourly YYYYMMDDhhmm-YYYYMMDDhhmm). Each one is
+compiled into a RangeParser that works on a whole array of ranges at
+once: the strings are viewed as a code point matrix, the digit columns
+are checked and turned into numbers with one matrix product, and the
+fields become numpy datetime64 start/end arrays. Invalid ranges (wrong
+shape, month 13, 30 February, start after end) come back as NaT with a
+False in the valid mask.
+
+Each frequency/ term maps to the granularity its files must use and to
+the step between time points, so that the files of a dataset can be
+checked for gaps and overlaps with a sort and a couple of vectorised
+comparisons.
+
+Usage:
+  python _scripts/time_range.py [NAMES_FILE|-] [--no-coverage] [--format tsv|jsonl]
+"""
+
+import argparse
+import collections
+import json
+import sys
+
+import numpy as np
+
+from cv_common import REPO_ROOT, load_term_ids, load_yaml
+from drs_validate import read_names
+
+
+# Digit fields of one side of the range, per time_range term
+LAYOUTS = {
+    "monthly": (("year", 4), ("month", 2)),
+    "daily": (("year", 4), ("month", 2), ("day", 2)),
+    "hourly": (("year", 4), ("month", 2), ("day", 2), ("hour", 2), ("minute", 2)),
+}
+
+# frequency term -> (time_range term, step between time points in the
+# granularity's unit; None when it is not fixed). fx files have no time
+# range; frequencies missing here (yr, yrpt, dec) have no time_range term
+# of their own and accept any granularity, without gap checks.
+FREQUENCIES = {
+    "subhrpt": ("hourly", None),
+    "1hr": ("hourly", 60),
+    "1hrpt": ("hourly", 60),
+    "3hr": ("hourly", 180),
+    "3hrpt": ("hourly", 180),
+    "6hr": ("hourly", 360),
+    "6hrpt": ("hourly", 360),
+    "day": ("daily", 1),
+    "mon": ("monthly", 1),
+    "monpt": ("monthly", 1),
+    "monc": ("monthly", 1),
+    "1hrcm": ("monthly", 1),
+    "fx": (None, None),
+}
+
+UNITS = {"monthly": "M", "daily": "D", "hourly": "m"}
+
+# Common unit for ranges of different granularities
+COMMON_UNIT = "datetime64[m]"
+
+TimeRanges = collections.namedtuple("TimeRanges", "start end valid")
+FileRanges = collections.namedtuple("FileRanges", "start end valid stepped errors")
+Gap = collections.namedtuple("Gap", "group kind start end")
+
+
+class RangeParser:
+    """Vectorised parser for one time_range granularity."""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = [field for field, _ in fields]
+        self.unit = f"datetime64[{UNITS[name]}]"
+        width = sum(w for _, w in fields)
+        self.length = 2 * width + 1
+        self.separator = width
+
+        # Digit columns of both sides, and the matrix that folds them into
+        # one number per field: (2 * width) digits -> (2 * n_fields) values
+        self.digit_columns = np.r_[0:width, width + 1:self.length]
+        self.weights = np.zeros((2 * width, 2 * len(fields)), dtype=np.int64)
+        for side in range(2):
+            column = side * width
+            for i, (_, w) in enumerate(fields):
+                for k in range(w):
+                    self.weights[column + k, side * len(fields) + i] = 10 ** (w - 1 - k)
+                column += w
+
+    def _codes(self, ranges):
+        # One extra column catches strings longer than the layout
+        array = np.asarray(ranges, dtype=f"U{self.length + 1}")
+        return array.view(np.uint32).reshape(len(array), self.length + 1)
+
+    def _to_datetime(self, values, valid):
+        fields = dict(zip(self.fields, values.T))
+        month = fields["month"]
+        valid &= (month >= 1) & (month <= 12)
+        months = (fields["year"] - 1970) * 12 + np.clip(month, 1, 12) - 1
+        when = months.astype("datetime64[M]")
+        if "day" in fields:
+            day = fields["day"]
+            days = when.astype("datetime64[D]") + (day - 1)
+            valid &= (day >= 1) & (days.astype("datetime64[M]") == when)
+            when = days
+        if "hour" in fields:
+            hour, minute = fields["hour"], fields["minute"]
+            valid &= (hour < 24) & (minute < 60)
+            when = when.astype("datetime64[m]") + hour * 60 + minute
+        return when.astype(self.unit)
+
+    def parse(self, ranges):
+        """Parse a sequence of range strings into a TimeRanges of datetime64 arrays."""
+        if len(ranges) == 0:
+            empty = np.array([], dtype=self.unit)
+            return TimeRanges(empty, empty.copy(), np.array([], dtype=bool))
+
+        codes = self._codes(ranges)
+        valid = (codes[:, self.length] == 0) & (codes[:, self.separator] == ord("-"))
+        # Unsigned, so anything below "0" wraps around and fails too
+        digits = codes[:, self.digit_columns] - np.uint32(ord("0"))
+        valid &= (digits <= 9).all(axis=1)
+
+        values = np.where(digits <= 9, digits, 0).astype(np.int64) @ self.weights
+        n = len(self.fields)
+        start = self._to_datetime(values[:, :n], valid)
+        end = self._to_datetime(values[:, n:], valid)
+        valid &= start <= end
+
+        start[~valid] = np.datetime64("NaT", UNITS[self.name])
+        end[~valid] = np.datetime64("NaT", UNITS[self.name])
+        return TimeRanges(start, end, valid)
+
+
+class TimeRangeEngine:
+    """time_range parsers and frequency rules compiled from the collections."""
+
+    def __init__(self, repo_root=REPO_ROOT):
+        self.parsers = {
+            term: RangeParser(term, LAYOUTS[term])
+            for term in load_term_ids("time_range", repo_root)
+            if term in LAYOUTS
+        }
+        self.frequencies = {
+            frequency: FREQUENCIES.get(frequency, ("*", None))
+            for frequency in load_term_ids("frequency", repo_root)
+        }
+
+    def granularity(self, frequency):
+        """time_range term expected for a frequency: a name, "*" for any, or None for none."""
+        return self.frequencies[frequency.lower()][0]
+
+    def parse(self, ranges, granularity):
+        return self.parsers[granularity].parse(ranges)
+
+    def parse_files(self, frequencies, ranges):
+        """Parse the time ranges of many files with their frequencies.
+
+        ranges may hold None for files without a time range. Returns a
+        FileRanges in minutes where end is exclusive (last time point plus
+        one step), valid marks the rows with a parsed range, stepped the
+        rows whose step is known, and errors lists (index, reason) for the
+        invalid rows.
+        """
+        count = len(ranges)
+        start = np.full(count, np.datetime64("NaT", "m"))
+        end = start.copy()
+        valid = np.zeros(count, dtype=bool)
+        stepped = np.zeros(count, dtype=bool)
+        errors = []
+
+        rows = collections.defaultdict(list)
+        for i, (frequency, value) in enumerate(zip(frequencies, ranges)):
+            rule = self.frequencies.get(frequency.lower())
+            if rule is None:
+                errors.append((i, f"unknown frequency {frequency!r}"))
+            elif value is None:
+                continue
+            elif rule[0] is None:
+                errors.append((i, f"{frequency} files have no time range"))
+            else:
+                rows[rule].append(i)
+
+        for (granularity, step), indices in rows.items():
+            indices = np.asarray(indices)
+            values = [ranges[i] for i in indices]
+            if granularity == "*":
+                parsed_start, parsed_end, parsed_valid = self._parse_any(values)
+            else:
+                parsed = self.parsers[granularity].parse(values)
+                parsed_start, parsed_end, parsed_valid = parsed
+                if step is not None:
+                    parsed_end = parsed_end + np.timedelta64(step, UNITS[granularity])
+                    stepped[indices] = parsed_valid
+            if granularity == "*" or step is None:
+                # Without a step the last time point is the best end we have
+                parsed_end = parsed_end.astype(COMMON_UNIT)
+            start[indices] = parsed_start.astype(COMMON_UNIT)
+            end[indices] = parsed_end.astype(COMMON_UNIT)
+            valid[indices] = parsed_valid
+            for i in indices[~parsed_valid]:
+                expected = "a time range" if granularity == "*" else f"a {granularity} time range"
+                errors.append((int(i), f"{ranges[i]!r} is not {expected}"))
+
+        errors.sort()
+        return FileRanges(start, end, valid, stepped, errors)
+
+    def _parse_any(self, values):
+        start = np.full(len(values), np.datetime64("NaT", "m"))
+        end = start.copy()
+        valid = np.zeros(len(values), dtype=bool)
+        for parser in self.parsers.values():
+            parsed = parser.parse(values)
+            take = parsed.valid & ~valid
+            start[take] = parsed.start[take].astype(COMMON_UNIT)
+            end[take] = parsed.end[take].astype(COMMON_UNIT)
+            valid |= take
+        return start, end, valid
+
+
+def find_gaps(groups, start, end, valid, stepped):
+    """Gaps and overlaps between consecutive files of the same group.
+
+    groups labels the dataset of each file (e.g. the file name without its
+    time range); end is exclusive. Gaps are only reported between files
+    whose step is known.
+    """
+    labels, codes = np.unique(np.asarray(groups, dtype=object), return_inverse=True)
+    keep = np.flatnonzero(valid)
+    order = keep[np.lexsort((start[keep], codes[keep]))]
+
+    code, first, last = codes[order], start[order], end[order]
+    same = code[1:] == code[:-1]
+    gap = same & (first[1:] > last[:-1]) & stepped[order][1:] & stepped[order][:-1]
+    overlap = same & (first[1:] < last[:-1])
+
+    # A gap runs from the end of one file to the start of the next, an
+    # overlap from the start of the next file to the end of the previous one
+    found = [Gap(labels[code[i]], "gap", last[i], first[i + 1]) for i in np.flatnonzero(gap)]
+    found.extend(Gap(labels[code[i]], "overlap", first[i + 1], last[i]) for i in np.flatnonzero(overlap))
+    found.sort(key=lambda g: (g.group, g.start))
+    return found
+
+
+def split_file_names(names, drs_specs=None, repo_root=REPO_ROOT):
+    """Return (frequencies, ranges, groups) from file names laid out as in drs_specs.yaml."""
+    if drs_specs is None:
+        drs_specs = load_yaml(repo_root / "drs_specs.yaml")
+    spec = drs_specs["file_name"]
+    separator = spec["separator"]
+    collections_ = [p["source_collection"] for p in spec["parts"]]
+    frequency_at = collections_.index("frequency")
+    range_at = collections_.index("time_range")
+
+    frequencies, ranges, groups = [], [], []
+    for name in names:
+        stem = name.rsplit(".", 1)[0]
+        values = stem.split(separator)
+        frequencies.append(values[frequency_at] if len(values) > frequency_at else "")
+        has_range = len(values) > range_at
+        ranges.append(values[range_at] if has_range else None)
+        groups.append(separator.join(values[:range_at]))
+    return frequencies, ranges, groups
+
+
+def _iso(value):
+    return str(np.datetime_as_string(value, unit="m"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the time ranges of file names")
+    parser.add_argument("names", nargs="?", default="-", help="File of names, one per line (default: stdin)")
+    parser.add_argument("--no-coverage", action="store_true", help="Skip the gap and overlap checks")
+    parser.add_argument("--format", default="tsv", choices=["tsv", "jsonl"])
+    args = parser.parse_args()
+
+    fh = sys.stdin if args.names == "-" else open(args.names)
+    names = list(read_names(fh))
+    if fh is not sys.stdin:
+        fh.close()
+
+    engine = TimeRangeEngine()
+    frequencies, ranges, groups = split_file_names(names)
+    parsed = engine.parse_files(frequencies, ranges)
+    gaps = [] if args.no_coverage else find_gaps(groups, *parsed[:4])
+
+    for i, reason in parsed.errors:
+        if args.format == "jsonl":
+            print(json.dumps({"name": names[i], "ok": False, "reason": reason}))
+        else:
+            print(f"{names[i]}\tFAIL\t{reason}")
+    for gap in gaps:
+        if args.format == "jsonl":
+            print(json.dumps({"group": gap.group, "kind": gap.kind, "start": _iso(gap.start), "end": _iso(gap.end)}))
+        else:
+            print(f"{gap.group}\t{gap.kind.upper()}\t{_iso(gap.start)}\t{_iso(gap.end)}")
+
+    if parsed.errors or gaps:
+        print(f"{len(parsed.errors)} invalid time range(s), {len(gaps)} gap(s)/overlap(s)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
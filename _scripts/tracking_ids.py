@@ -0,0 +1,240 @@
+"""
+Bulk tracking_id validation and a persistent index of published ids.
+
+tracking_id/prefuuid.json allows a handle prefix followed by a UUID
+(hdl:21.14102/<8-4-4-4-12 hex>). Instead of running that regex per id,
+a batch is laid out as a byte matrix: the prefix and hyphen columns are
+compared in one go, the hex columns go through a 256-entry lookup table,
+and each valid id becomes its 16 UUID bytes.
+
+Published ids are kept as a sorted numpy array of those 16-byte keys
+(_build/tracking_ids.npy, memory-mapped on load), so checking a batch
+against everything seen before is a single searchsorted, and recording a
+batch is a merge. Ids are compared by UUID value, so upper and lower case
+spellings of the same id are duplicates.
+
+Usage:
+  python _scripts/tracking_ids.py check [IDS_FILE|-] [--index PATH] [--record]
+                                        [--failures-only] [--format tsv|jsonl]
+  python _scripts/tracking_ids.py info [--index PATH]
+
+Input lines are either a tracking_id or "name<TAB>tracking_id".
+"""
+
+import argparse
+import collections
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from cv_common import BUILD_DIR, REPO_ROOT, load_json
+
+
+INDEX_PATH = BUILD_DIR / "tracking_ids.npy"
+KEY_DTYPE = "S16"
+
+UUID_GROUPS = (8, 4, 4, 4, 12)
+UUID_REGEX = "-".join(f"[a-fA-F0-9]{{{n}}}" for n in UUID_GROUPS)
+
+# Hex digit value per byte, -1 for anything else
+HEX_VALUES = np.full(256, -1, dtype=np.int16)
+for _i, _c in enumerate(b"0123456789abcdef"):
+    HEX_VALUES[_c] = _i
+for _i, _c in enumerate(b"ABCDEF"):
+    HEX_VALUES[_c] = 10 + _i
+
+Check = collections.namedtuple("Check", "valid duplicate seen")
+
+
+def handle_prefix(regex):
+    """Literal prefix of a tracking_id regex of the form ^<prefix><uuid>$."""
+    match = re.fullmatch(r"\^((?:[^\\\[(.*+?{|^$]|\\.)*)" + re.escape(UUID_REGEX) + r"\$", regex)
+    if match is None:
+        raise ValueError(f"tracking_id regex is not a literal prefix followed by a UUID: {regex!r}")
+    return re.sub(r"\\(.)", r"\1", match.group(1))
+
+
+class TrackingIdParser:
+    """Byte-level parser for <prefix><uuid> tracking ids."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix.encode()
+        self.length = len(self.prefix) + sum(UUID_GROUPS) + len(UUID_GROUPS) - 1
+
+        self.hyphen_columns = []
+        hex_columns = []
+        column = len(self.prefix)
+        for n in UUID_GROUPS:
+            hex_columns.extend(range(column, column + n))
+            column += n
+            self.hyphen_columns.append(column)
+            column += 1
+        self.hyphen_columns.pop()
+        self.hex_columns = np.array(hex_columns)
+        self.prefix_bytes = np.frombuffer(self.prefix, dtype=np.uint8)
+
+    @classmethod
+    def from_collection(cls, repo_root=REPO_ROOT):
+        term = load_json(Path(repo_root) / "tracking_id" / "prefuuid.json")
+        return cls(handle_prefix(term["regex"]))
+
+    def parse(self, ids):
+        """Return (keys, valid): 16-byte UUID keys (S16) and a validity mask."""
+        # One extra column catches ids longer than the layout; ids that are
+        # not ASCII are invalid anyway, so they are replaced before encoding
+        raw = [i if i.isascii() else "" for i in ids]
+        matrix = np.asarray(raw, dtype=f"S{self.length + 1}")
+        matrix = matrix.view(np.uint8).reshape(len(raw), self.length + 1)
+
+        valid = matrix[:, self.length] == 0
+        valid &= (matrix[:, : len(self.prefix)] == self.prefix_bytes).all(axis=1)
+        valid &= (matrix[:, self.hyphen_columns] == ord("-")).all(axis=1)
+        nibbles = HEX_VALUES[matrix[:, self.hex_columns]]
+        valid &= (nibbles >= 0).all(axis=1)
+
+        nibbles = np.where(valid[:, None], nibbles, 0).astype(np.uint8)
+        keys = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+        return np.ascontiguousarray(keys).view(KEY_DTYPE).ravel(), valid
+
+    def format(self, key):
+        value = bytes(key).ljust(16, b"\0").hex()
+        return f"{self.prefix.decode()}{value[:8]}-{value[8:12]}-{value[12:16]}-{value[16:20]}-{value[20:]}"
+
+
+class TrackingIndex:
+    """Sorted array of the UUID keys of every recorded tracking id."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        if self.path.exists():
+            self.keys = np.load(self.path, mmap_mode="r")
+        else:
+            self.keys = np.array([], dtype=KEY_DTYPE)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def contains(self, keys):
+        """Boolean mask of the keys already in the index."""
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.searchsorted(self.keys, keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == keys[found]
+        return found
+
+    def add(self, keys):
+        """Merge keys into the index and write it back; returns the number of new keys."""
+        before = len(self.keys)
+        self.keys = np.union1d(self.keys, keys).astype(KEY_DTYPE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp, self.keys)
+        tmp.replace(self.path)
+        return len(self.keys) - before
+
+
+def check_batch(parser, index, ids):
+    """Validate a batch of ids: returns (keys, Check) of boolean masks.
+
+    duplicate marks every id after the first with the same UUID within the
+    batch, seen marks the ids already in the index.
+    """
+    keys, valid = parser.parse(ids)
+    duplicate = np.zeros(len(keys), dtype=bool)
+    positions = np.flatnonzero(valid)
+    if len(positions):
+        _, first = np.unique(keys[positions], return_index=True)
+        duplicate[positions] = True
+        duplicate[positions[first]] = False
+    seen = np.zeros(len(keys), dtype=bool)
+    seen[valid] = index.contains(keys[valid])
+    return keys, Check(valid, duplicate, seen)
+
+
+def read_ids(fh):
+    """Return (names, ids) from lines holding an id or name<TAB>id."""
+    names, ids = [], []
+    for line in fh.read().splitlines():
+        if not line:
+            continue
+        name, _, value = line.rpartition("\t")
+        names.append(name or value)
+        ids.append(value.strip())
+    return names, ids
+
+
+def cmd_check(args):
+    fh = sys.stdin if args.ids == "-" else open(args.ids)
+    names, ids = read_ids(fh)
+    if fh is not sys.stdin:
+        fh.close()
+
+    parser = TrackingIdParser.from_collection()
+    index = TrackingIndex(args.index)
+    keys, check = check_batch(parser, index, ids)
+
+    failed = 0
+    for i, (name, value) in enumerate(zip(names, ids)):
+        if not check.valid[i]:
+            reason = "invalid tracking_id"
+        elif check.duplicate[i]:
+            reason = "duplicate in batch"
+        elif check.seen[i]:
+            reason = "already published"
+        else:
+            reason = None
+        if reason:
+            failed += 1
+        elif args.failures_only:
+            continue
+        if args.format == "jsonl":
+            print(json.dumps({"name": name, "tracking_id": value, "ok": reason is None, "reason": reason}))
+        elif reason:
+            print(f"{name}\tFAIL\t{value}\t{reason}")
+        else:
+            print(f"{name}\tOK")
+
+    if args.record:
+        new = check.valid & ~check.duplicate & ~check.seen
+        added = index.add(keys[new])
+        print(f"Recorded {added} new tracking_id(s); {len(index)} in {args.index}", file=sys.stderr)
+
+    if failed:
+        print(f"{failed} of {len(ids)} tracking_id(s) failed", file=sys.stderr)
+        sys.exit(1)
+
+
+def cmd_info(args):
+    index = TrackingIndex(args.index)
+    print(f"{args.index}: {len(index)} tracking_id(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate tracking ids and check them for duplicates")
+    parser.add_argument("--index", default=str(INDEX_PATH), help="Index of recorded ids (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = sub.add_parser("check", help="Validate a batch of tracking ids")
+    check_parser.add_argument("ids", nargs="?", default="-", help="File of ids, one per line (default: stdin)")
+    check_parser.add_argument("--record", action="store_true", help="Add the valid new ids to the index")
+    check_parser.add_argument("--failures-only", action="store_true")
+    check_parser.add_argument("--format", default="tsv", choices=["tsv", "jsonl"])
+
+    sub.add_parser("info", help="Show the size of the index")
+
+    args = parser.parse_args()
+
+    commands = {
+        "check": cmd_check,
+        "info": cmd_info,
+    }
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Indexed lookups of esgvoc universe terms for the create_* generators.
+
+Each data descriptor is loaded once per process and indexed by its
+drs_name, as is and normalised, so matching n upstream names against m
+universe terms is O(n + m) instead of a nested scan.
+
+Terms come from an offline snapshot when one exists for the
+universe_version pinned in esgvoc_manifest.yaml, and from esgvoc
+otherwise. A snapshot is a gzipped JSON file of the data descriptors the
+generators use; write one with
+
+  python _scripts/universe.py snapshot [--output PATH]
+
+Environment:
+  OBS4REF_UNIVERSE_SNAPSHOT=F  Snapshot to use (default: _build/universe-<version>.json.gz)
+  OBS4REF_OFFLINE=1            Fail instead of querying esgvoc without a snapshot
+"""
+
+import argparse
+import functools
+import gzip
+import json
+import os
+import sys
+import types
+from pathlib import Path
+
+from cv_common import BUILD_DIR, load_manifest
+from instrument import span
+
+
+# Data descriptors read by the create_* generators and sync_collections.py
+SNAPSHOT_DATA_DESCRIPTORS = (
+    "source",
+    "variable",
+    "grid",
+    "resolution",
+    "institution",
+    "consortium",
+    "organisation",
+    "region",
+    "obs_type",
+)
+
+SNAPSHOT_FORMAT = "obs4ref-universe-snapshot/1"
+
+
+def normalise(name):
+    """Matching key for drs_names: case and spaces are ignored ("1x1 degree" == "1x1degree")."""
+    return name.replace(" ", "").upper()
+
+
+def pinned_version():
+    return str(load_manifest()["universe_version"])
+
+
+def default_snapshot_path(version=None):
+    return BUILD_DIR / f"universe-{version or pinned_version()}.json.gz"
+
+
+def _dump_term(term):
+    if hasattr(term, "model_dump"):
+        return term.model_dump(mode="json")
+    return dict(vars(term))
+
+
+def write_snapshot(path=None, data_descriptors=SNAPSHOT_DATA_DESCRIPTORS):
+    """Export data descriptors from esgvoc to a snapshot pinned to the manifest's universe_version."""
+    import esgvoc.api as ev
+
+    version = pinned_version()
+    path = Path(path or default_snapshot_path(version))
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "universe_version": version,
+        "data_descriptors": {
+            dd: [_dump_term(t) for t in ev.get_all_terms_in_data_descriptor(dd)] for dd in data_descriptors
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    # No name or mtime in the gzip header, so the same terms always give the same bytes
+    with open(tmp, "wb") as raw, gzip.GzipFile(filename="", fileobj=raw, mode="wb", mtime=0) as fh:
+        fh.write(json.dumps(snapshot, sort_keys=True, separators=(",", ":")).encode())
+    tmp.replace(path)
+    return path, snapshot
+
+
+@functools.cache
+def load_snapshot(path=None):
+    """Return {data descriptor: [terms]} from a snapshot, or None if there is none.
+
+    Snapshot terms are plain namespaces with the attributes of the esgvoc
+    terms (id, type, drs_name, ...).
+    """
+    explicit = path or os.environ.get("OBS4REF_UNIVERSE_SNAPSHOT")
+    path = Path(explicit) if explicit else default_snapshot_path()
+    if not path.exists():
+        if explicit:
+            raise FileNotFoundError(f"universe snapshot {path} does not exist")
+        return None
+
+    with span("universe.snapshot", path=str(path)), gzip.open(path, "rb") as fh:
+        snapshot = json.load(fh)
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path}: not a universe snapshot")
+    if snapshot["universe_version"] != pinned_version():
+        raise ValueError(
+            f"{path}: snapshot of universe {snapshot['universe_version']}, "
+            f"esgvoc_manifest.yaml pins {pinned_version()}"
+        )
+    return {
+        dd: tuple(types.SimpleNamespace(**term) for term in terms)
+        for dd, terms in snapshot["data_descriptors"].items()
+    }
+
+
+@functools.cache
+def get_terms(data_descriptor):
+    snapshot = load_snapshot()
+    if snapshot is not None and data_descriptor in snapshot:
+        return snapshot[data_descriptor]
+    if os.environ.get("OBS4REF_OFFLINE", "") not in ("", "0"):
+        raise FileNotFoundError(f"{data_descriptor}: not in a universe snapshot and running offline")
+
+    with span("universe.query", data_descriptor=data_descriptor):
+        import esgvoc.api as ev
+
+        return tuple(ev.get_all_terms_in_data_descriptor(data_descriptor))
+
+
+@functools.cache
+def _drs_name_index(data_descriptor):
+    """({drs_name: [terms]}, {normalised drs_name: [terms]}) of one data descriptor."""
+    exact, normalised = {}, {}
+    for term in get_terms(data_descriptor):
+        exact.setdefault(term.drs_name, []).append(term)
+        normalised.setdefault(normalise(term.drs_name), []).append(term)
+    return exact, normalised
+
+
+class TermIndex:
+    """drs_name -> term lookup over one or more data descriptors.
+
+    Descriptors are tried in the order listed, so the first one with the
+    name wins; within one, the name is looked up as is, then by its
+    normalised form. A name matching several terms of a descriptor is
+    reported on stderr and left unresolved rather than picked at random.
+    """
+
+    def __init__(self, *data_descriptors):
+        self.data_descriptors = data_descriptors
+        self._indexes = [_drs_name_index(data_descriptor) for data_descriptor in data_descriptors]
+        self._reported = set()
+
+    def __len__(self):
+        return len({key for _, normalised in self._indexes for key in normalised})
+
+    def get(self, name):
+        key = normalise(name)
+        for exact, normalised in self._indexes:
+            terms = exact.get(name) or normalised.get(key)
+            if terms:
+                break
+        else:
+            return None
+        if len(terms) > 1:
+            if name not in self._reported:
+                self._reported.add(name)
+                ids = ", ".join(sorted(f"{t.id} ({t.drs_name!r})" for t in terms))
+                print(f"warning: {name!r} matches several universe terms ({ids}); not resolved", file=sys.stderr)
+            return None
+        return terms[0]
+
+
+def cmd_snapshot(args):
+    path, snapshot = write_snapshot(args.output)
+    counts = ", ".join(f"{dd} {len(terms)}" for dd, terms in snapshot["data_descriptors"].items())
+    print(f"Wrote universe {snapshot['universe_version']} snapshot to {path} ({counts})")
+
+
+def cmd_info(args):
+    snapshot = load_snapshot(args.snapshot)
+    if snapshot is None:
+        print(f"No snapshot at {default_snapshot_path()}; terms come from esgvoc", file=sys.stderr)
+        sys.exit(1)
+    for dd, terms in snapshot.items():
+        print(f"{dd}\t{len(terms)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline snapshots of the esgvoc universe")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snapshot_parser = sub.add_parser("snapshot", help="Export the generators' data descriptors")
+    snapshot_parser.add_argument("--output", help="Snapshot path (default: _build/universe-<version>.json.gz)")
+
+    info_parser = sub.add_parser("info", help="Show the snapshot in use")
+    info_parser.add_argument("--snapshot", help="Snapshot path")
+
+    args = parser.parse_args()
+
+    commands = {
+        "snapshot": cmd_snapshot,
+        "info": cmd_info,
+    }
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Validate netCDF global attributes against attr_specs.yaml.
+
+attr_specs.yaml is compiled once into a flat check plan: for each
+attribute its name in the file (attr_field_name, e.g. Conventions or
+grid), the collection it comes from, an optional specific_key to compare
+against (e.g. the description of the file's grid_label term) and its
+string / string_array value type. Only the header of each file is read
+(see nc_header.py), files are spread over a process pool and a result
+is streamed per file in input order.
+
+Pre-extracted header dumps (JSON or `ncdump -h` output) are accepted in
+place of netCDF files. Universe attributes needed by specific_key checks
+(descriptions, label_extended) can be supplied with --terms; when a key
+is unknown, only the presence of the attribute is checked.
+
+Usage:
+  python _scripts/validate_attrs.py FILE... [--from LIST] [--jobs N]
+                                    [--terms FILE] [--failures-only] [--format text|jsonl]
+"""
+
+import argparse
+import collections
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from cv_common import REPO_ROOT, TERM_PATTERNS, iter_term_files, load_json, load_yaml
+from nc_header import HeaderError, read_global_attributes
+
+
+AttrCheck = collections.namedtuple("AttrCheck", "attribute collection key value_type is_required")
+
+# Term fields whose text is itself a valid attribute value; other fields
+# (descriptions, labels, urls...) only qualify under a specific_key check
+FREE_TEXT_FIELDS = {"conditions"}
+
+
+class TermRule:
+    """Accepted values of one collection: ids, drs_names, free texts (license conditions) and patterns."""
+
+    def __init__(self, terms):
+        self.terms = {term["id"].lower(): term for term in terms}
+        self.drs_names = frozenset(term["drs_name"] for term in terms if isinstance(term.get("drs_name"), str))
+        self.texts = frozenset(
+            term[key].strip() for term in terms for key in FREE_TEXT_FIELDS if isinstance(term.get(key), str)
+        )
+        patterns = [TERM_PATTERNS[t["id"]] for t in terms if t["id"] in TERM_PATTERNS]
+        self.pattern = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        self.regexes = [re.compile(t["regex"]) for t in terms if isinstance(t.get("regex"), str)]
+
+    def lookup(self, value):
+        """Term named by value, ignoring case and spaces ("250 km" -> 250km)."""
+        lowered = value.lower()
+        return self.terms.get(lowered) or self.terms.get(lowered.replace(" ", ""))
+
+    def accepts(self, value):
+        lowered = value.lower()
+        if lowered in self.terms and lowered not in TERM_PATTERNS:
+            return True
+        if value in self.drs_names or value.strip() in self.texts:
+            return True
+        if self.pattern is not None and self.pattern.fullmatch(lowered):
+            return True
+        return any(regex.fullmatch(value) for regex in self.regexes)
+
+
+class CheckPlan:
+    """attr_specs.yaml compiled against the term files."""
+
+    def __init__(self, attr_specs=None, terms=None, repo_root=REPO_ROOT):
+        if attr_specs is None:
+            attr_specs = load_yaml(repo_root / "attr_specs.yaml")
+
+        self.checks = [
+            AttrCheck(
+                spec.get("attr_field_name") or spec["source_collection"],
+                spec["source_collection"],
+                spec.get("specific_key"),
+                spec.get("attr_field_value_type", "string"),
+                spec.get("is_required", False),
+            )
+            for spec in attr_specs
+        ]
+
+        self.rules = {}
+        for collection in sorted({c.collection for c in self.checks}):
+            collection_terms = [load_json(f) for f in iter_term_files(repo_root / collection)]
+            for term in collection_terms:
+                term.update(((terms or {}).get(collection) or {}).get(term["id"], {}))
+            self.rules[collection] = TermRule(collection_terms)
+
+    def _values(self, check, value):
+        if check.value_type == "string_array":
+            if isinstance(value, str):
+                return value.split()
+            if isinstance(value, list) and all(isinstance(v, str) for v in value):
+                return value
+            return None
+        return [value] if isinstance(value, str) else None
+
+    def check(self, attributes):
+        """Return the list of problems with a file's global attributes."""
+        errors = []
+        for check in self.checks:
+            if check.attribute not in attributes:
+                if check.is_required:
+                    errors.append(f"{check.attribute}: missing")
+                continue
+
+            values = self._values(check, attributes[check.attribute])
+            if not values:
+                errors.append(f"{check.attribute}: expected a {check.value_type}")
+                continue
+
+            rule = self.rules[check.collection]
+            if check.key is None:
+                for value in values:
+                    if not rule.accepts(value):
+                        errors.append(f"{check.attribute}: {value!r} is not a valid {check.collection}")
+                continue
+
+            if check.attribute == check.collection:
+                # The attribute holds the key of its own term (e.g. the
+                # nominal_resolution description), or the term itself
+                value = values[0]
+                if rule.lookup(value) is None and not any(t.get(check.key) == value for t in rule.terms.values()):
+                    errors.append(f"{check.attribute}: {value!r} is not a {check.key} of {check.collection}")
+                continue
+
+            # Otherwise compare with the key of the term named by the
+            # attribute that holds the collection itself (grid -> grid_label)
+            term_value = attributes.get(check.collection)
+            term = rule.lookup(term_value) if isinstance(term_value, str) else None
+            if term is None:
+                continue
+            expected = term.get(check.key)
+            if expected is None and check.key == "drs_name":
+                if values[0].lower() != term["id"].lower():
+                    errors.append(f"{check.attribute}: {values[0]!r} does not match {check.collection} {term_value!r}")
+            elif expected is not None and values[0] != expected:
+                errors.append(f"{check.attribute}: expected {expected!r} for {check.collection} {term_value!r}")
+        return errors
+
+
+_worker_plan = None
+
+
+def _init_worker(plan):
+    global _worker_plan
+    _worker_plan = plan
+
+
+def check_file(path):
+    """Return (path, errors) for one netCDF file or header dump."""
+    try:
+        attributes = read_global_attributes(path)
+    except (OSError, HeaderError, ValueError) as exc:
+        return path, [f"unreadable header: {exc}"]
+    return path, _worker_plan.check(attributes)
+
+
+def check_files(plan, paths, jobs=1, chunksize=64):
+    """Yield (path, errors) per file, in input order."""
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(plan,)) as pool:
+            yield from pool.map(check_file, paths, chunksize=chunksize)
+    else:
+        _init_worker(plan)
+        for path in paths:
+            yield check_file(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate netCDF global attributes against attr_specs.yaml")
+    parser.add_argument("files", nargs="*", help="netCDF files or header dumps")
+    parser.add_argument("--from", dest="from_file", help="File (or -) listing paths, one per line")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--terms", help="JSON {collection: {id: {key: value}}} with universe attributes")
+    parser.add_argument("--failures-only", action="store_true")
+    parser.add_argument("--format", default="text", choices=["text", "jsonl"])
+    args = parser.parse_args()
+
+    paths = list(args.files)
+    if args.from_file:
+        fh = sys.stdin if args.from_file == "-" else open(args.from_file)
+        paths.extend(line.strip() for line in fh if line.strip())
+
+    plan = CheckPlan(terms=load_json(args.terms) if args.terms else None)
+
+    failed = 0
+    for path, errors in check_files(plan, paths, args.jobs):
+        if errors:
+            failed += 1
+        elif args.failures_only:
+            continue
+        if args.format == "jsonl":
+            print(json.dumps({"path": path, "ok": not errors, "errors": errors}))
+        elif errors:
+            print(f"{path}: FAIL")
+            for error in errors:
+                print(f"  {error}")
+        else:
+            print(f"{path}: OK")
+
+    if failed:
+        print(f"{failed} of {len(paths)} file(s) failed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
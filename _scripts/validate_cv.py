@@ -0,0 +1,237 @@
+"""
+Validate every term file of every collection.
+
+Checks, per collection:
+  context       000_context.jsonld parses and has an "@context" object
+  json          the term file parses to an object
+  @context      the term points at its collection's 000_context.jsonld
+  id            present, lowercase, usable as an IRI segment; duplicates
+                are errors, a stem differing from the id is a warning
+  type          present and the same for the whole collection; differing
+                from the @base segment of the context is a warning
+  regex         every "regex" field compiles
+
+Contexts are parsed once in the parent process and handed to the
+workers; collections are checked in parallel with --jobs.
+
+Usage:
+  python _scripts/validate_cv.py [--jobs N] [--format text|json|junit] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
+from cv_common import CONTEXT_FILENAME, REPO_ROOT, iter_collection_dirs, iter_term_files
+
+
+ID_RE = re.compile(r"^[a-z0-9][a-z0-9._-]*$")
+
+ERROR = "error"
+WARNING = "warning"
+
+
+def _result(collection, file, check, severity, message):
+    return {
+        "collection": collection,
+        "file": file,
+        "check": check,
+        "severity": severity,
+        "message": message,
+    }
+
+
+def load_contexts(repo_root=REPO_ROOT):
+    """Parse every collection context once: {collection: (path, context or None, error)}."""
+    contexts = {}
+    # Every directory counts, so one that lost its context is reported
+    for name, path in iter_collection_dirs(repo_root, require_context=False):
+        try:
+            with open(path / CONTEXT_FILENAME) as fh:
+                context = json.load(fh)["@context"]
+            if not isinstance(context, dict):
+                raise ValueError("@context is not an object")
+            contexts[name] = (str(path), context, None)
+        except FileNotFoundError:
+            contexts[name] = (str(path), None, f"{CONTEXT_FILENAME} is missing")
+        except (ValueError, KeyError, TypeError) as exc:
+            contexts[name] = (str(path), None, f"{CONTEXT_FILENAME}: {exc}")
+    return contexts
+
+
+def _regex_fields(content, prefix=""):
+    for key, value in content.items():
+        if isinstance(value, dict):
+            yield from _regex_fields(value, f"{prefix}{key}.")
+        elif key == "regex" and isinstance(value, str):
+            yield f"{prefix}{key}", value
+
+
+def check_collection(name, path, context, context_error):
+    """Run every term-level check for one collection and return the results."""
+    results = []
+    if context_error:
+        results.append(_result(name, CONTEXT_FILENAME, "context", ERROR, context_error))
+
+    base_type = None
+    if context and isinstance(context.get("@base"), str):
+        base_type = context["@base"].rstrip("/").rsplit("/", 1)[-1]
+
+    ids_seen = defaultdict(list)
+    types_seen = defaultdict(list)
+    for term_file in iter_term_files(path):
+        file = term_file.name
+        try:
+            with open(term_file) as fh:
+                content = json.load(fh)
+        except ValueError as exc:
+            results.append(_result(name, file, "json", ERROR, str(exc)))
+            continue
+        if not isinstance(content, dict):
+            results.append(_result(name, file, "json", ERROR, "term is not a JSON object"))
+            continue
+
+        if content.get("@context") != CONTEXT_FILENAME:
+            results.append(_result(
+                name, file, "@context", ERROR,
+                f"@context is {content.get('@context')!r}, expected {CONTEXT_FILENAME!r}",
+            ))
+
+        term_id = content.get("id")
+        if not isinstance(term_id, str):
+            results.append(_result(name, file, "id", ERROR, "missing or non-string id"))
+        else:
+            ids_seen[term_id].append(file)
+            if not ID_RE.match(term_id):
+                results.append(_result(name, file, "id", ERROR, f"id {term_id!r} is not a lowercase IRI segment"))
+            if term_id != term_file.stem:
+                results.append(_result(name, file, "id", WARNING, f"id {term_id!r} differs from the file name"))
+
+        term_type = content.get("type")
+        if not isinstance(term_type, str):
+            results.append(_result(name, file, "type", ERROR, "missing or non-string type"))
+        else:
+            types_seen[term_type].append(file)
+
+        for field, pattern in _regex_fields(content):
+            try:
+                re.compile(pattern)
+            except re.error as exc:
+                results.append(_result(name, file, "regex", ERROR, f"{field}: {exc}"))
+
+    for term_id, files in ids_seen.items():
+        if len(files) > 1:
+            results.append(_result(name, files[0], "id", ERROR, f"duplicate id {term_id!r} in {files}"))
+
+    if len(types_seen) > 1:
+        majority = max(types_seen, key=lambda t: len(types_seen[t]))
+        for term_type, files in types_seen.items():
+            if term_type != majority:
+                for file in files:
+                    results.append(_result(
+                        name, file, "type", ERROR,
+                        f"type {term_type!r} differs from the collection's {majority!r}",
+                    ))
+    elif types_seen and base_type is not None:
+        (term_type,) = types_seen
+        if term_type != base_type:
+            results.append(_result(
+                name, CONTEXT_FILENAME, "type", WARNING,
+                f"terms have type {term_type!r} but @base ends in {base_type!r}",
+            ))
+
+    return name, len(ids_seen), results
+
+
+def validate(repo_root=REPO_ROOT, jobs=None):
+    """Validate the whole tree; returns (collections, n_terms, results)."""
+    contexts = load_contexts(repo_root)
+    tasks = [(name, path, context, error) for name, (path, context, error) in contexts.items()]
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            outcomes = list(pool.map(check_collection, *zip(*tasks)))
+    else:
+        outcomes = [check_collection(*task) for task in tasks]
+
+    results = [r for _, _, collection_results in outcomes for r in collection_results]
+    n_terms = sum(n for _, n, _ in outcomes)
+    return [name for name, _, _ in outcomes], n_terms, results
+
+
+def format_text(collections, n_terms, results):
+    lines = [
+        f"{r['severity'].upper()}: {r['collection']}/{r['file']} [{r['check']}] {r['message']}"
+        for r in results
+    ]
+    errors = sum(r["severity"] == ERROR for r in results)
+    lines.append(
+        f"Checked {n_terms} terms in {len(collections)} collections: "
+        f"{errors} error(s), {len(results) - errors} warning(s)."
+    )
+    return "\n".join(lines)
+
+
+def format_junit(collections, n_terms, results):
+    by_collection = defaultdict(list)
+    for r in results:
+        by_collection[r["collection"]].append(r)
+
+    errors = [r for r in results if r["severity"] == ERROR]
+    suites = ElementTree.Element(
+        "testsuites", name="cv-validation", tests=str(len(collections)), failures=str(len(errors)),
+    )
+    for collection in collections:
+        collection_results = by_collection.get(collection, [])
+        collection_errors = [r for r in collection_results if r["severity"] == ERROR]
+        suite = ElementTree.SubElement(
+            suites, "testsuite", name=collection,
+            tests=str(max(len(collection_results), 1)), failures=str(len(collection_errors)),
+        )
+        if not collection_results:
+            ElementTree.SubElement(suite, "testcase", classname=collection, name="all terms")
+        for r in collection_results:
+            case = ElementTree.SubElement(suite, "testcase", classname=collection, name=f"{r['file']}:{r['check']}")
+            if r["severity"] == ERROR:
+                ElementTree.SubElement(case, "failure", message=r["message"])
+            else:
+                ElementTree.SubElement(case, "system-out").text = f"warning: {r['message']}"
+    return ElementTree.tostring(suites, encoding="unicode")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate all CV collections")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", default="text", choices=["text", "json", "junit"])
+    parser.add_argument("--output", help="Write the report to a file instead of stdout")
+    args = parser.parse_args()
+
+    collections, n_terms, results = validate(jobs=args.jobs)
+
+    if args.format == "json":
+        report = json.dumps(
+            {"collections": collections, "terms": n_terms, "results": results}, indent=2,
+        )
+    elif args.format == "junit":
+        report = format_junit(collections, n_terms, results)
+    else:
+        report = format_text(collections, n_terms, results)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(report + "\n")
+    else:
+        print(report)
+
+    if any(r["severity"] == ERROR for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Index of dataset versions, for latest / all versions / as-of queries.
+
+A dataset id is its base id (matched by regex_base_id in
+catalog_specs.yaml) followed by a version/creationdatenb segment,
+vYYYYMMDD. The index keeps, per base id, a sorted array of the versions
+as YYYYMMDD integers: the latest version is the last element, and an
+as-of query is a bisect. New versions are inserted in place, and the
+index is saved as JSON so successive publication runs only add what is
+new.
+
+Usage:
+  python _scripts/version_index.py add [IDS_FILE|-] [--index PATH]
+  python _scripts/version_index.py latest [BASE_ID...] [--index PATH]
+  python _scripts/version_index.py versions BASE_ID [--index PATH]
+  python _scripts/version_index.py as-of YYYYMMDD [BASE_ID...] [--index PATH]
+"""
+
+import argparse
+import array
+import bisect
+import datetime
+import functools
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+from cv_common import BUILD_DIR, REPO_ROOT, TERM_PATTERNS, load_json, load_yaml
+from drs_validate import read_names
+
+
+INDEX_PATH = BUILD_DIR / "version_index.json"
+
+VERSION_RE = re.compile(TERM_PATTERNS["creationdatenb"])
+
+
+@functools.lru_cache(maxsize=65_536)
+def parse_version(segment):
+    """vYYYYMMDD -> YYYYMMDD as an int, or None if it is not a valid date."""
+    if VERSION_RE.fullmatch(segment.lower()) is None:
+        return None
+    value = int(segment[1:])
+    try:
+        datetime.date(value // 10000, value // 100 % 100, value % 100)
+    except ValueError:
+        return None
+    return value
+
+
+def format_version(value):
+    return f"v{value:08d}"
+
+
+class VersionIndex:
+    """Sorted version arrays per base dataset id."""
+
+    def __init__(self, catalog_specs=None, repo_root=REPO_ROOT):
+        if catalog_specs is None:
+            catalog_specs = load_yaml(repo_root / "catalog_specs.yaml")
+        properties = catalog_specs["catalog_properties"]
+        self.regex_id = re.compile(properties["regex_id"])
+        self.regex_base_id = re.compile(properties["regex_base_id"])
+        self.versions = {}
+
+    def split(self, dataset_id):
+        """Return (base_id, version) for a dataset id, or None if it is not one."""
+        if self.regex_id.fullmatch(dataset_id) is None:
+            return None
+        base_id, _, segment = dataset_id.rpartition(".")
+        version = parse_version(segment)
+        if version is None or self.regex_base_id.fullmatch(base_id) is None:
+            return None
+        return base_id, version
+
+    def add(self, dataset_ids):
+        """Insert dataset ids; returns (number of new versions, invalid ids)."""
+        added = 0
+        invalid = []
+        for dataset_id in dataset_ids:
+            split = self.split(dataset_id)
+            if split is None:
+                invalid.append(dataset_id)
+                continue
+            base_id, version = split
+            versions = self.versions.get(base_id)
+            if versions is None:
+                versions = self.versions[base_id] = array.array("I")
+            # Publication order is mostly chronological: append when possible
+            if not versions or version > versions[-1]:
+                versions.append(version)
+            else:
+                i = bisect.bisect_left(versions, version)
+                if i < len(versions) and versions[i] == version:
+                    continue
+                versions.insert(i, version)
+            added += 1
+        return added, invalid
+
+    def all_versions(self, base_id):
+        return list(self.versions.get(base_id, ()))
+
+    def latest(self, base_id):
+        versions = self.versions.get(base_id)
+        return versions[-1] if versions else None
+
+    def as_of(self, base_id, date):
+        """Latest version published on or before date (YYYYMMDD int)."""
+        versions = self.versions.get(base_id)
+        if not versions:
+            return None
+        i = bisect.bisect_right(versions, date)
+        return versions[i - 1] if i else None
+
+    def dataset_id(self, base_id, version):
+        return f"{base_id}.{format_version(version)}"
+
+    def save(self, path=INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as fh:
+            json.dump({base: v.tolist() for base, v in sorted(self.versions.items())}, fh)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH, catalog_specs=None, repo_root=REPO_ROOT):
+        index = cls(catalog_specs, repo_root)
+        if Path(path).exists():
+            index.versions = {base: array.array("I", v) for base, v in load_json(path).items()}
+        return index
+
+
+def cmd_add(args):
+    fh = sys.stdin if args.ids == "-" else open(args.ids)
+    index = VersionIndex.load(args.index)
+    added, invalid = index.add(read_names(fh))
+    if fh is not sys.stdin:
+        fh.close()
+    index.save(args.index)
+
+    for dataset_id in invalid:
+        print(f"{dataset_id}\tFAIL\tnot a versioned dataset id")
+    print(f"Added {added} version(s); {len(index.versions)} dataset(s) in {args.index}", file=sys.stderr)
+    if invalid:
+        sys.exit(1)
+
+
+def _selected(index, base_ids):
+    return base_ids or sorted(index.versions)
+
+
+def cmd_latest(args):
+    index = VersionIndex.load(args.index)
+    for base_id in _selected(index, args.base_ids):
+        version = index.latest(base_id)
+        if version is not None:
+            print(index.dataset_id(base_id, version))
+
+
+def cmd_versions(args):
+    index = VersionIndex.load(args.index)
+    for version in index.all_versions(args.base_id):
+        print(index.dataset_id(args.base_id, version))
+
+
+def cmd_as_of(args):
+    date = parse_version(f"v{args.date}")
+    if date is None:
+        print(f"error: invalid date '{args.date}', expected YYYYMMDD", file=sys.stderr)
+        sys.exit(1)
+    index = VersionIndex.load(args.index)
+    for base_id in _selected(index, args.base_ids):
+        version = index.as_of(base_id, date)
+        if version is not None:
+            print(index.dataset_id(base_id, version))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index dataset versions per base dataset id")
+    parser.add_argument("--index", default=str(INDEX_PATH), help="Index file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = sub.add_parser("add", help="Record dataset ids")
+    add_parser.add_argument("ids", nargs="?", default="-", help="File of dataset ids, one per line (default: stdin)")
+
+    latest_parser = sub.add_parser("latest", help="Latest version per base id")
+    latest_parser.add_argument("base_ids", nargs="*", metavar="BASE_ID")
+
+    versions_parser = sub.add_parser("versions", help="All versions of a base id")
+    versions_parser.add_argument("base_id")
+
+    as_of_parser = sub.add_parser("as-of", help="Latest version per base id on a date")
+    as_of_parser.add_argument("date", help="YYYYMMDD")
+    as_of_parser.add_argument("base_ids", nargs="*", metavar="BASE_ID")
+
+    args = parser.parse_args()
+
+    commands = {
+        "add": cmd_add,
+        "latest": cmd_latest,
+        "versions": cmd_versions,
+        "as-of": cmd_as_of,
+    }
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()